@@ -1,19 +1,22 @@
 """baksteenservice - action.py"""
 
 
-import html, logging, re, xml.etree.ElementTree as ET
+import logging
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List
 
 
 import requests
-from bs4 import BeautifulSoup
-from openai import OpenAI
 
 
-import secrets as _secrets
+import apotheek as _apotheek
 import config
+import llm as _llm
+import metrics
+import nieuws as _nieuws
 import route as _route
+import upstream
+import weer as _weer
 
 
 logger = logging.getLogger("baksteenservice.action")
@@ -24,20 +27,6 @@ IRAIL_USER_AGENT = "baksteenservice/1.0 (github.com/sakkeprot/baksteenservice)"
 IRAIL_RESULTS    = 6
 
 
-NEWS_FEEDS = [
-    "https://www.vrt.be/vrtnws/nl.rss.articles.xml",
-    "https://www.demorgen.be/rss.xml",
-]
-
-
-_SKIP_TEXT = {"cookie", "essentieel", "verplicht", "privac", "javascript",
-              "openingsuren", "meer info", "toon", "\u00a9", "zoek"}
-
-
-_ADDRESS_RE = re.compile(r'.+\d+.*\d{4}\s+\w+', re.IGNORECASE)
-
-
-
 # ── Hulpfuncties ───────────────────────────────────────────────────────────────
 
 
@@ -83,27 +72,6 @@ def _fmt_train(conn: dict) -> str:
     return " ".join(parts)
 
 
-def _classify_pharmacy_texts(texts: List[str]):
-    name = address = phone = None
-    for t in texts:
-        t = t.strip()
-        if not t or len(t) < 2:
-            continue
-        if any(s in t.lower() for s in _SKIP_TEXT):
-            continue
-        if re.match(r'^[\d\s/+]{7,15}$', t):
-            if not phone:
-                phone = t.replace(" ", "")
-            continue
-        if _ADDRESS_RE.match(t) or re.search(r'\d{4}', t):
-            if not address:
-                address = t
-            continue
-        if not name and len(t) > 3:
-            name = t
-    return name, address, phone
-
-
 
 # ── ActionHandler ──────────────────────────────────────────────────────────────
 
@@ -130,10 +98,7 @@ class ActionHandler:
             "apotheker_help": self._action_apotheker_help,
             "unknown":        self._action_unknown,
         }
-        self._gpt_client = OpenAI(
-            api_key=_secrets.DEEPSEEK_API_KEY,
-            base_url="https://api.deepseek.com",
-        )
+        self._translator = _llm.TranslationBatcher()   # VERTALING_* read per batch
 
     def execute(self, analysis: Dict) -> Dict:
         intent = analysis.get("intent", "unknown")
@@ -144,6 +109,7 @@ class ActionHandler:
             logger.info(f"Action '{intent}' -> {str(result['message'])[:80]}")
             return result
         except Exception as e:
+            metrics.inc("baksteen_action_errors_total", intent=intent)
             logger.error(f"Action '{intent}' raised: {e}", exc_info=True)
             return {"success": False, "message": f"Fout: {e}", "data": {}}
 
@@ -172,22 +138,18 @@ class ActionHandler:
         if not prompt:
             return {"success": False, "message": "Geen prompt ontvangen.", "data": {}}
         max_len = config.sms_max("gpt")
-        r = self._gpt_client.chat.completions.create(
-            model="deepseek-chat", stream=False,
-            messages=[
-                {"role": "system", "content": (
-                    f"U bent de assistent van een inwoner van Belgie. "
-                    f"Uw volledige antwoord wordt als sms bezorgd aan de verzoeker. "
-                    f"Het antwoord mag maximaal {max_len} tekens lang zijn (inclusief spaties). "
-                    f"Herhaal de vraag niet, antwoord direct, bondig en correct. "
-                    f"Vermeld de tekenlimiet niet. "
-                    f"Antwoord in de taal van de vraagsteller."
-                )},
-                {"role": "user", "content": prompt},
-            ])
-        return {"success": True,
-                "message": _truncate(r.choices[0].message.content.strip(), max_len),
-                "data": {}}
+        answer = _llm.answer(_llm.get_client(), max_len=max_len, messages=[
+            {"role": "system", "content": (
+                f"U bent de assistent van een inwoner van Belgie. "
+                f"Uw volledige antwoord wordt als sms bezorgd aan de verzoeker. "
+                f"Het antwoord mag maximaal {max_len} tekens lang zijn (inclusief spaties). "
+                f"Herhaal de vraag niet, antwoord direct, bondig en correct. "
+                f"Vermeld de tekenlimiet niet. "
+                f"Antwoord in de taal van de vraagsteller."
+            )},
+            {"role": "user", "content": prompt},
+        ])
+        return {"success": True, "message": answer, "data": {}}
 
     def _action_gpt_help(self, params):
         return {"success": False, "message": (
@@ -206,7 +168,7 @@ class ActionHandler:
         arr      = params.get("arrival",   "")
         dep_time = params.get("time", datetime.now())
         try:
-            resp = requests.get(
+            resp = upstream.get(
                 f"{IRAIL_BASE}/connections/", timeout=10,
                 headers={"User-Agent": IRAIL_USER_AGENT},
                 params={
@@ -293,26 +255,8 @@ class ActionHandler:
 
 
     def _resolve_city_id(self, city: str):
-        def _search(query: str):
-            try:
-                r = requests.get(
-                    "http://api.weatherapi.com/v1/search.json", timeout=10,
-                    params={"key": _secrets.OWM_API_KEY, "q": query})
-                r.raise_for_status()
-                return r.json()
-            except requests.RequestException as e:
-                logger.error(f"WeatherAPI search error: {e}")
-                return []
-        city_lower = city.strip().lower()
-        results = _search(city)
-        for loc in results:
-            if loc["name"].lower() == city_lower:
-                return loc["id"]
-        results_be = _search(f"{city},belgie")
-        for loc in results_be:
-            if loc["name"].lower() == city_lower:
-                return loc["id"]
-        return results[0]["id"] if results else None
+        """WeatherAPI q-value for city; search.json only runs for unknown names."""
+        return _weer.zoek_locatie(city)
 
     def _fetch_weather(self, city: str, language: str) -> Dict:
         """Shared weather fetch; language controls response labels."""
@@ -321,44 +265,32 @@ class ActionHandler:
             msg = f"Ville '{city}' introuvable." if language == "fr" else f"Stad '{city}' niet gevonden."
             return {"success": False, "message": msg, "data": {}}
         try:
-            r = requests.get(
-                "http://api.weatherapi.com/v1/forecast.json", timeout=10,
-                params={"key": _secrets.OWM_API_KEY, "q": f"id:{location_id}", "days": 1,
-                        "lang": language, "aqi": "no", "alerts": "no"})
-            r.raise_for_status()
+            d = _weer.voorspelling(location_id)
         except requests.RequestException as e:
             msg = f"M\u00e9t\u00e9o erreur: {e}" if language == "fr" else f"Weer fout: {e}"
             return {"success": False, "message": msg, "data": {}}
-        d        = r.json()
-        name     = d["location"]["name"]
-        day      = d["forecast"]["forecastday"][0]["day"]
-        min_c    = round(day["mintemp_c"])
-        max_c    = round(day["maxtemp_c"])
+        name     = _weer.naam(city) or d["name"]
+        min_c    = round(d["min_c"])
+        max_c    = round(d["max_c"])
         now_hour = datetime.now().hour
-        hours    = d["forecast"]["forecastday"][0]["hour"]
-        upcoming = [h for h in hours
-                    if int(h["time"].split(" ")[1].split(":")[0]) >= now_hour][:4]
+        upcoming = [h for h in d["hours"] if h["hour"] >= now_hour][:4]
         if not upcoming:
             msg = "Pas de donn\u00e9es horaires disponibles." if language == "fr" else "Geen uurlijkse data beschikbaar."
             return {"success": False, "message": msg, "data": {}}
         if language == "fr":
             lines = [name, f"Auj. min: {min_c}C max: {max_c}C"]
             for h in upcoming:
-                t    = h["time"].split(" ")[1][:5]
                 temp = round(h["temp_c"])
-                desc = h["condition"]["text"]
+                desc = _weer.conditie(h["code"], h["is_day"], "fr")
                 wind = round(h["wind_kph"])
-                rain = h.get("chance_of_rain", 0)
-                lines.append(f"{t} {temp}C {desc}, vent: {wind}km/h, pluie: {rain}%")
+                lines.append(f"{h['time']} {temp}C {desc}, vent: {wind}km/h, pluie: {h['chance_of_rain']}%")
         else:
             lines = [name, f"Vandaag min: {min_c}C max: {max_c}C"]
             for h in upcoming:
-                t    = h["time"].split(" ")[1][:5]
                 temp = round(h["temp_c"])
-                desc = h["condition"]["text"]
+                desc = _weer.conditie(h["code"], h["is_day"], "nl")
                 wind = round(h["wind_kph"])
-                rain = h.get("chance_of_rain", 0)
-                lines.append(f"{t} {temp}C {desc}, wind: {wind}km/h, regen: {rain}%")
+                lines.append(f"{h['time']} {temp}C {desc}, wind: {wind}km/h, regen: {h['chance_of_rain']}%")
         return {"success": True,
                 "message": _truncate("\n".join(lines), config.sms_max("weer")),
                 "data": {}}
@@ -395,27 +327,13 @@ class ActionHandler:
 
 
     def _action_nieuws(self, params: Dict) -> Dict:
-        max_len = config.sms_max("nieuws")
-        for feed_url in NEWS_FEEDS:
-            try:
-                r = requests.get(feed_url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
-                if r.status_code != 200 or not r.content:
-                    continue
-                root  = ET.fromstring(r.content)
-                items = root.findall(".//item")[:3]
-                if not items:
-                    continue
-                lines = []
-                for item in items:
-                    title = html.unescape(item.findtext("title", "").strip())
-                    if len(title) > 100:
-                        title = title[:99] + "..."
-                    lines.append(title)
-                msg = "\n".join(f"{i+1}. {t}" for i, t in enumerate(lines))
-                return {"success": True, "message": _truncate(msg, max_len), "data": {}}
-            except Exception as e:
-                logger.warning(f"RSS {feed_url} failed: {e}")
-        return {"success": False, "message": "Nieuws tijdelijk niet beschikbaar.", "data": {}}
+        msg = _nieuws.antwoord()
+        if msg is None:
+            _nieuws.ververs()   # poller not started or nothing fetched yet
+            msg = _nieuws.antwoord()
+        if msg is None:
+            return {"success": False, "message": "Nieuws tijdelijk niet beschikbaar.", "data": {}}
+        return {"success": True, "message": _truncate(msg, config.sms_max("nieuws")), "data": {}}
 
 
 
@@ -433,15 +351,11 @@ class ActionHandler:
             "tr": "Turkish", "ar": "Arabic",  "zh": "Chinese",    "ru": "Russian",
         }
         lang_full = lang_names.get(lang.lower(), lang)
-        r = self._gpt_client.chat.completions.create(
-            model="deepseek-chat", stream=False,
-            messages=[
-                {"role": "system", "content": f"Translate to {lang_full}. Return ONLY the translation."},
-                {"role": "user",   "content": text},
-            ])
-        translation = r.choices[0].message.content.strip()
+        max_len   = config.sms_max("vertaling")
+        budget    = max(max_len - len(f"{text} -> "), 20)
+        translation = self._translator.translate(text, lang.lower(), lang_full, budget)
         return {"success": True,
-                "message": _truncate(f"{text} -> {translation}", config.sms_max("vertaling")),
+                "message": _truncate(f"{text} -> {translation}", max_len),
                 "data": {}}
 
     def _action_vertaling_help(self, params):
@@ -464,40 +378,18 @@ class ActionHandler:
 
 
     def _action_apotheker(self, params: Dict) -> Dict:
-        import json
         query = params.get("postcode", "").strip()
         if not query:
             return {"success": False, "message": "Gebruik: apotheker <postcode>", "data": {}}
         try:
-            r = requests.get(
-                "https://www.apotheek.be/PharmacySearch",
-                params={"OnDutyTouched": "true", "Query": query, "OnDuty": "true"},
-                headers={"User-Agent": "Mozilla/5.0", "Accept-Language": "nl-BE"},
-                timeout=10,
-            )
-            r.raise_for_status()
+            pharmacies = _apotheek.zoek(query)
         except requests.RequestException as e:
             return {"success": False, "message": f"Apotheek fout: {e}", "data": {}}
-        soup    = BeautifulSoup(r.text, "html.parser")
         results: List[str] = []
-        for card in soup.select(".pharmacy-accordion-card[data-pharmacy]"):
-            raw = card.get("data-pharmacy", "")
-            if not raw:
-                continue
-            try:
-                data = json.loads(raw)
-            except json.JSONDecodeError:
-                continue
-            if not data.get("OnDuty", False):
-                continue
-            name    = data.get("Name",    "").strip()
-            address = data.get("Address", "").strip()
-            phone   = data.get("Phone",   "").strip()
-            line_parts = [p for p in [name, address, phone] if p]
+        for p in pharmacies:
+            line_parts = [v for v in [p["name"], p["address"], p["phone"]] if v]
             if line_parts:
                 results.append("\n".join(line_parts))
-            if len(results) >= 2:
-                break
         max_len = config.sms_max("apotheker")
         if results:
             return {"success": True,
@@ -0,0 +1,176 @@
+"""baksteenservice - apotheek.py
+Wachtapotheken via apotheek.be.
+Exporteert: zoek(postcode) -> List[dict]   (max 2 x {"name", "address", "phone"})
+
+Het wachtrooster wisselt enkel op vaste uren (APOTHEEK_WISSELUREN), dus een
+resultaat blijft geldig tot de volgende wissel (een leeg resultaat slechts
+APOTHEEK_LEEG_TTL seconden). Postcodes die in de adressen van een resultaat
+opduiken (de buurgemeenten) worden meteen in de achtergrond opgehaald, zodat
+ook die vragen meestal zonder upstream request beantwoord worden.
+
+De pagina wordt niet volledig geparsed: enkel de tags met een data-pharmacy
+attribuut gaan door _KaartLezer, terwijl de response binnenstroomt, en het
+lezen stopt na twee apotheken van wacht.
+"""
+
+import codecs
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from html.parser import HTMLParser
+from typing import Iterable, List, Tuple
+
+import requests
+
+import config
+import upstream
+from cache import TTLCache
+
+
+log = logging.getLogger("baksteenservice.apotheek")
+
+
+_SEARCH      = "https://www.apotheek.be/PharmacySearch"
+_POSTCODE_RE = re.compile(r"\b[1-9]\d{3}\b")
+_MAX_RESULTS = 2
+_CHUNK       = 8192
+_KAART_KLASSE = "pharmacy-accordion-card"
+# Het stuk van de '<' tot aan data-pharmacy= moet de start-tag zelf zijn: geen
+# '>' ertussen. Zo wordt b.v. querySelectorAll('[data-pharmacy]') in een
+# <script> nooit aan de lezer gegeven.
+_EIGEN_TAG_RE = re.compile(r"<[A-Za-z][\w:-]*\s[^<>]*$")
+_ATTR_RE      = re.compile(r"data-pharmacy\s*=")
+
+
+# (postcode, begin van de lopende dienst) -> resultaten
+_resultaten = TTLCache(ttl=3600, max_items=2000)
+_prefetch   = ThreadPoolExecutor(max_workers=2, thread_name_prefix="apotheek")
+
+
+
+# ── Wachtdienst ────────────────────────────────────────────────────────────────
+
+
+def _dienst(nu: datetime) -> Tuple[datetime, datetime]:
+    """Begin en einde van de wachtdienst die op `nu` loopt."""
+    vandaag = nu.replace(minute=0, second=0, microsecond=0)
+    grenzen = sorted(vandaag.replace(hour=h) for h in config.APOTHEEK_WISSELUREN)
+    grenzen = ([grenzen[-1] - timedelta(days=1)] + grenzen + [grenzen[0] + timedelta(days=1)])
+    for begin, einde in zip(grenzen, grenzen[1:]):
+        if begin <= nu < einde:
+            return begin, einde
+    return nu, nu + timedelta(hours=1)   # niet bereikbaar
+
+
+
+# ── Ophalen ────────────────────────────────────────────────────────────────────
+
+
+class _KaartLezer(HTMLParser):
+    """Leest de data-pharmacy JSON uit één .pharmacy-accordion-card tag; bouwt geen boom."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.results: List[dict] = []
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        raw = a.get("data-pharmacy")
+        if not raw or _KAART_KLASSE not in (a.get("class") or "").split():
+            return
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            return
+        if not data.get("OnDuty", False):
+            return
+        self.results.append({
+            "name":    data.get("Name",    "").strip(),
+            "address": data.get("Address", "").strip(),
+            "phone":   data.get("Phone",   "").strip(),
+        })
+
+
+def _lees_kaarten(chunks: Iterable[bytes], encoding: str) -> List[dict]:
+    """
+    Zoekt in de binnenkomende HTML naar data-pharmacy= en geeft enkel de tag
+    die dat attribuut draagt aan een verse lezer; de rest van de pagina
+    (scripts inbegrepen) wordt niet getokeniseerd. Stopt zodra er genoeg
+    apotheken zijn.
+    """
+    results: List[dict] = []
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    buf     = ""
+    for chunk in chunks:
+        buf += decoder.decode(chunk)
+        while len(results) < _MAX_RESULTS:
+            m = _ATTR_RE.search(buf)
+            if m is None:
+                buf = buf[max(buf.rfind("<"), 0):]   # mogelijk begin van een kaart-tag
+                break
+            i     = m.start()
+            begin = buf.rfind("<", 0, i)
+            einde = buf.find("<", i)
+            if einde < 0:
+                buf = buf[max(begin, 0):]
+                break   # tag nog niet volledig binnen
+            if begin >= 0 and _EIGEN_TAG_RE.match(buf, begin, i):
+                lezer = _KaartLezer()
+                lezer.feed(buf[begin:einde])
+                lezer.close()
+                results.extend(lezer.results)
+            buf = buf[einde:]
+        if len(results) >= _MAX_RESULTS:
+            break
+    return results[:_MAX_RESULTS]
+
+
+def _haal(postcode: str) -> List[dict]:
+    """Eén PharmacySearch request, herleid tot max 2 apotheken van wacht."""
+    with upstream.get(
+        _SEARCH,
+        params={"OnDutyTouched": "true", "Query": postcode, "OnDuty": "true"},
+        headers={"User-Agent": "Mozilla/5.0", "Accept-Language": "nl-BE"},
+        timeout=10, stream=True,
+    ) as r:
+        r.raise_for_status()
+        return _lees_kaarten(r.iter_content(_CHUNK), r.encoding or "utf-8")
+
+
+def _zoek(postcode: str, gehaald: list) -> List[dict]:
+    nu = datetime.now()
+    begin, einde = _dienst(nu)
+    rest = (einde - nu).total_seconds()
+
+    def fetch():
+        gehaald.append(postcode)
+        return _haal(postcode)
+    results = _resultaten.get_or_fetch((postcode, begin), fetch, ttl=rest)
+    if not results and postcode in gehaald:
+        # een lege pagina (storing, consent/captcha) niet de hele dienst bewaren
+        _resultaten.put((postcode, begin), results, ttl=min(config.APOTHEEK_LEEG_TTL, rest))
+    return results
+
+
+def _haal_buren(postcode: str, results: List[dict]) -> None:
+    for p in {m for r in results for m in _POSTCODE_RE.findall(r["address"])} - {postcode}:
+        gehaald: list = []
+        try:
+            _zoek(p, gehaald)
+        except requests.RequestException as e:
+            log.warning("Buurpostcode %s: %s", p, e)
+            continue
+        if gehaald:
+            log.info("Buurpostcode %s vooraf opgehaald (via %s)", p, postcode)
+
+
+def zoek(postcode: str) -> List[dict]:
+    """Apotheken van wacht voor postcode, gecachet tot de volgende dienstwissel.
+    Gooit requests.RequestException als apotheek.be niet bereikbaar is."""
+    gehaald: list = []
+    results = _zoek(postcode, gehaald)
+    if gehaald:
+        _prefetch.submit(_haal_buren, postcode, results)
+    return results
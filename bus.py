@@ -2,14 +2,26 @@
 De Lijn routeplanner via Open Data API.
 Exporteert: vind_route(van, naar, max_routes, vanaf) -> dict
             vind_halte(naam)                          -> dict
+            start_catalogus()
 Beide returnen {"ok": bool, "msg": str}
+
+Haltes en lijnrichtingen komen uit de lokale catalogus (haltes.py) zodra die
+geladen is; de zoek-API wordt dan enkel nog gebruikt als terugval.
 """
 
 import logging
+import threading
+import time
 import requests
 from datetime import datetime
 from typing import Dict, List, Optional, Set, Tuple
 
+import config
+import haltes
+import ledger
+import route as _route
+import upstream
+from cache import TTLCache
 import secrets as _secrets
 
 log = logging.getLogger("baksteenservice.bus")
@@ -17,20 +29,40 @@ log = logging.getLogger("baksteenservice.bus")
 _ZOEK = "https://api.delijn.be/DLZoekOpenData/v1"
 _KERN = "https://api.delijn.be/DLKernOpenData/api/v1"
 _HDR  = {
-    "Ocp-Apim-Subscription-Key": _secrets.DELIJN_API_KEY,
+    "Ocp-Apim-Subscription-Key": getattr(_secrets, "DELIJN_API_KEY", ""),
     "Cache-Control": "no-cache",
     "Accept": "application/json",
     "User-Agent": "baksteenservice/1.0",
 }
 
 
+def laad_sleutel() -> None:
+    """Neemt DELIJN_API_KEY opnieuw over uit secrets (na een config-reload)."""
+    _HDR["Ocp-Apim-Subscription-Key"] = getattr(_secrets, "DELIJN_API_KEY", "")
+
+
+_BOUW_PAUZE   = 0.2     # s tussen lijnrichting-calls bij opbouw catalogus
+_CHECK_INTERV = 3600    # s tussen leeftijdscontroles van de catalogus
+
+_LOOPSTRAAL = 400       # m rond herkend/gegeocodeerd punt voor kandidaat-haltes
+_MAX_KANDIDATEN = 8
+
+# Doorkomsten per (entiteitnummer, haltenummer), gedeeld over alle requests
+_DOORKOMSTEN = TTLCache(ttl=30, max_items=2000)
+
+
 # ── lage-level ────────────────────────────────────────────────────────────────────────────
 
+def _api_json(url: str, params: dict = None) -> dict:
+    """GET als JSON; gooit RequestException, zodat een fout niet als leeg antwoord gecachet wordt."""
+    r = upstream.get(url, headers=_HDR, params=params, timeout=10)
+    r.raise_for_status()
+    return r.json()
+
+
 def _api_get(url: str, params: dict = None) -> Optional[dict]:
     try:
-        r = requests.get(url, headers=_HDR, params=params, timeout=10)
-        r.raise_for_status()
-        return r.json()
+        return _api_json(url, params)
     except requests.RequestException as e:
         log.error("GET %s -> %s", url, e)
         return None
@@ -45,7 +77,11 @@ def _zoek_haltes_pagina(naam: str, start: int = 0, max_hits: int = 15) -> Tuple[
 
 
 def _zoek_haltes_alle(naam: str, max_total: int = 30) -> List[dict]:
-    """Haalt alle haltes op via paginering (max max_total)."""
+    """Haalt alle haltes op via de catalogus, anders via paginering (max max_total)."""
+    if haltes.geladen():
+        alle = haltes.zoek(naam, max_total)
+        log.info("  zoek '%s': %d haltes (catalogus)", naam, len(alle))
+        return alle
     totaal, eerste = _zoek_haltes_pagina(naam, start=0, max_hits=15)
     log.info("  zoek '%s': %d totaal, %d in pagina 1", naam, totaal, len(eerste))
     alle = list(eerste)
@@ -63,30 +99,58 @@ def _zoek_haltes_alle(naam: str, max_total: int = 30) -> List[dict]:
 
 
 def _get_lijnrichtingen(e: str, n: str) -> List[dict]:
+    lrs = haltes.lijnrichtingen(e, n)
+    if lrs is not None:
+        return lrs
     data = _api_get(f"{_KERN}/haltes/{e}/{n}/lijnrichtingen")
     return (data or {}).get("lijnrichtingen", [])
 
 
 def _get_realtime(e: str, n: str, max_dc: int = 12) -> List[dict]:
-    data = _api_get(f"{_KERN}/haltes/{e}/{n}/real-time",
-                    {"maxAantalDoorkomsten": max_dc})
+    data = _api_json(f"{_KERN}/haltes/{e}/{n}/real-time",
+                     {"maxAantalDoorkomsten": max_dc})
     result = []
-    for hd in (data or {}).get("halteDoorkomsten", []):
+    for hd in data.get("halteDoorkomsten", []):
         result.extend(hd.get("doorkomsten", []))
     return result
 
 
 def _get_dienstregeling(e: str, n: str) -> List[dict]:
-    data = _api_get(f"{_KERN}/haltes/{e}/{n}/dienstregelingen")
+    data = _api_json(f"{_KERN}/haltes/{e}/{n}/dienstregelingen")
     result = []
-    for hd in (data or {}).get("halteDoorkomsten", []):
+    for hd in data.get("halteDoorkomsten", []):
         result.extend(hd.get("doorkomsten", []))
     return result
 
 
+class _NietCachen(Exception):
+    """Antwoord na een upstream fout: wel tonen, niet cachen."""
+
+    def __init__(self, dcs: List[dict]):
+        super().__init__()
+        self.dcs = dcs
+
+
 def _get_doorkomsten(e: str, n: str, label: str) -> List[dict]:
-    """Realtime, met fallback naar dienstregeling."""
-    dcs = _get_realtime(e, n, max_dc=12)
+    """Realtime, met fallback naar dienstregeling. ~30 s gecachet per halte;
+    gelijktijdige vragen naar dezelfde halte delen één fetch. Enkel geslaagde
+    antwoorden worden gecachet: na een fout vraagt de volgende opnieuw."""
+    try:
+        return _DOORKOMSTEN.get_or_fetch((str(e), str(n)),
+                                         lambda: _haal_doorkomsten(e, n, label))
+    except _NietCachen as nc:
+        return nc.dcs
+    except requests.RequestException as err:
+        log.error("  %s: geen doorkomsten: %s", label, err)
+        return []
+
+
+def _haal_doorkomsten(e: str, n: str, label: str) -> List[dict]:
+    try:
+        dcs = _get_realtime(e, n, max_dc=12)
+    except requests.RequestException as err:
+        log.error("  %s: realtime fout (%s), probeer dienstregeling", label, err)
+        raise _NietCachen(_get_dienstregeling(e, n))
     if not dcs:
         log.info("  %s: realtime leeg, probeer dienstregeling", label)
         dcs = _get_dienstregeling(e, n)
@@ -96,6 +160,113 @@ def _get_doorkomsten(e: str, n: str, label: str) -> List[dict]:
     return dcs
 
 
+def _punt(naam: str) -> Optional[Tuple[float, float]]:
+    """Coördinaat voor naam: eerst een gekende halte uit de catalogus, anders geocode."""
+    beste = haltes.zoek(naam, max_total=1)
+    if beste and haltes.coordinaat(beste[0]):
+        return haltes.coordinaat(beste[0])
+    ll = _route._geocode(naam)
+    if not ll:
+        return None
+    lat, lon = ll.split(",")
+    return float(lat), float(lon)
+
+
+def _kandidaat_haltes(naam: str) -> List[dict]:
+    """
+    De paar haltes binnen loopafstand van naam (via het ruimtelijke raster),
+    in plaats van tot 30 naamgenoten verspreid over heel Vlaanderen.
+    Zonder catalogus: terugval op de naamzoeker.
+    """
+    if haltes.geladen():
+        punt = _punt(naam)
+        if punt:
+            kandidaten = haltes.dichtbij(punt[0], punt[1], _LOOPSTRAAL, _MAX_KANDIDATEN)
+            if kandidaten:
+                log.info("  '%s' -> %.5f,%.5f: %d haltes binnen %dm",
+                         naam, punt[0], punt[1], len(kandidaten), _LOOPSTRAAL)
+                return kandidaten
+    return _zoek_haltes_alle(naam, max_total=30)
+
+
+# ── catalogus ───────────────────────────────────────────────────────────────────────────
+
+def _bouw_catalogus() -> Optional[List[dict]]:
+    """
+    Bouwt de volledige haltelijst op, met lijnrichtingen per halte.
+    Lijnrichtingen worden per lijn opgehaald (lijn -> richtingen -> haltes) en
+    omgekeerd: dat zijn enkele duizenden calls i.p.v. één per halte.
+    Returnt None als de haltelijst zelf niet volledig opgehaald kon worden.
+    """
+    ents = _api_get(f"{_KERN}/entiteiten")
+    if not ents:
+        return None
+    per_halte: Dict[Tuple[str, str], dict] = {}
+    mislukt = 0
+    for ent in ents.get("entiteiten", []):
+        e    = str(ent.get("entiteitnummer", ""))
+        data = _api_get(f"{_KERN}/entiteiten/{e}/haltes")
+        if data is None:
+            return None
+        for h in data.get("haltes", []):
+            key = (str(h.get("entiteitnummer", e)), str(h.get("haltenummer", "")))
+            per_halte[key] = {
+                "entiteitnummer":       key[0],
+                "haltenummer":          key[1],
+                "omschrijving":         h.get("omschrijving", ""),
+                "omschrijvingGemeente": h.get("omschrijvingGemeente", ""),
+                "geoCoordinaat":        h.get("geoCoordinaat"),
+                "lijnrichtingen":       [],
+            }
+        log.info("Catalogus: entiteit %s, %d haltes", e, len(data.get("haltes", [])))
+
+        for lijn in (_api_get(f"{_KERN}/entiteiten/{e}/lijnen") or {}).get("lijnen", []):
+            l   = str(lijn.get("lijnnummer", ""))
+            lrs = _api_get(f"{_KERN}/lijnen/{e}/{l}/lijnrichtingen")
+            for lr in (lrs or {}).get("lijnrichtingen", []):
+                richting = lr.get("richting", "")
+                time.sleep(_BOUW_PAUZE)
+                data = _api_get(f"{_KERN}/lijnen/{e}/{l}/lijnrichtingen/{richting}/haltes")
+                if data is None:
+                    mislukt += 1
+                    continue
+                item = {"entiteitnummer": e, "lijnnummer": l, "richting": richting,
+                        "omschrijving": lr.get("omschrijving", "")}
+                for h in data.get("haltes", []):
+                    key = (str(h.get("entiteitnummer", e)), str(h.get("haltenummer", "")))
+                    if key in per_halte:
+                        per_halte[key]["lijnrichtingen"].append(item)
+    if mislukt:
+        log.warning("Catalogus: %d lijnrichtingen niet opgehaald (pass 2 vangt ze op)", mislukt)
+    return list(per_halte.values())
+
+
+def _catalogus_loop() -> None:
+    while True:
+        if haltes.leeftijd() >= config.HALTES_VERVERS_SEC and ledger.degraded("DELIJN_API_KEY"):
+            log.warning("De Lijn dagquota bijna op, catalogus herbouw uitgesteld")
+        elif haltes.leeftijd() >= config.HALTES_VERVERS_SEC:
+            log.info("Catalogus verouderd, herbouwen...")
+            try:
+                lijst = _bouw_catalogus()
+                if lijst:
+                    haltes.vervang(lijst)
+                else:
+                    log.error("Catalogus opbouw mislukt, oude versie blijft actief")
+            except Exception as e:
+                log.error("Catalogus opbouw: %s", e, exc_info=True)
+        time.sleep(_CHECK_INTERV)
+
+
+def start_catalogus() -> None:
+    """Laadt de catalogus van schijf en start de periodieke verversing."""
+    if not _HDR["Ocp-Apim-Subscription-Key"]:
+        log.info("Geen De Lijn API key, catalogus niet gestart")
+        return
+    haltes.laad()
+    threading.Thread(target=_catalogus_loop, daemon=True, name="haltes").start()
+
+
 # ── helpers ───────────────────────────────────────────────────────────────────────────────────
 
 def _parse_dt(ts: str) -> Optional[datetime]:
@@ -146,8 +317,8 @@ def vind_route(van_naam: str, naar_naam: str, max_routes: int = 3,
     nu = vanaf or datetime.now().replace(second=0, microsecond=0)
     log.info("Route: '%s' -> '%s' vanaf %s", van_naam, naar_naam, nu.strftime("%H:%M"))
 
-    van_haltes  = _zoek_haltes_alle(van_naam,  max_total=30)
-    naar_haltes = _zoek_haltes_alle(naar_naam, max_total=30)
+    van_haltes  = _kandidaat_haltes(van_naam)
+    naar_haltes = _kandidaat_haltes(naar_naam)
 
     if not van_haltes:
         return {"ok": False, "msg": "Geen halte gevonden voor '%s'." % van_naam}
@@ -200,8 +371,6 @@ def vind_route(van_naam: str, naar_naam: str, max_routes: int = 3,
     log.info("  Pass 1: %d perrons met match", len(perron_matches))
 
     # ── Pass 2: realtime scan voor perrons zonder match ─────────────────────────────
-    rt_cache: Dict[Tuple, List[dict]] = {}
-
     for vh in van_haltes:
         ve  = str(vh.get("entiteitnummer", ""))
         vn  = str(vh.get("haltenummer", ""))
@@ -210,7 +379,6 @@ def vind_route(van_naam: str, naar_naam: str, max_routes: int = 3,
         if pk in van_met_match:
             continue
         dcs = _get_doorkomsten(ve, vn, vnm)
-        rt_cache[pk] = dcs
         for d in dcs:
             lijn = str(d.get("lijnnummer", ""))
             if lijn in naar_lijn_nrs:
@@ -232,7 +400,7 @@ def vind_route(van_naam: str, naar_naam: str, max_routes: int = 3,
         for vh in van_haltes:
             ve = str(vh.get("entiteitnummer", ""))
             vn = str(vh.get("haltenummer", ""))
-            dcs = rt_cache.get((ve, vn)) or _get_realtime(ve, vn)
+            dcs = _get_doorkomsten(ve, vn, vh.get("omschrijving", van_naam))
             if dcs:
                 lines = [
                     "Geen directe lijn van '%s' naar '%s'." % (van_naam, naar_naam),
@@ -248,12 +416,7 @@ def vind_route(van_naam: str, naar_naam: str, max_routes: int = 3,
     vertrekken: List[Tuple[datetime, str, str]] = []
 
     for (ve, vn), info in perron_matches.items():
-        if (ve, vn) in rt_cache:
-            dcs = rt_cache[(ve, vn)]
-            log.info("  %s: gebruik gecachte %d doorkomsten", info["van_naam"], len(dcs))
-        else:
-            dcs = _get_doorkomsten(ve, vn, info["van_naam"])
-            rt_cache[(ve, vn)] = dcs
+        dcs = _get_doorkomsten(ve, vn, info["van_naam"])
 
         for lijn, naar_nm in info["lijnen"].items():
             gefilterd = [d for d in dcs if str(d.get("lijnnummer", "")) == lijn]
@@ -304,7 +467,7 @@ def vind_halte(naam: str) -> dict:
     for h in haltes:
         e   = str(h.get("entiteitnummer", ""))
         n   = str(h.get("haltenummer", ""))
-        dcs = _get_realtime(e, n)
+        dcs = _get_doorkomsten(e, n, h.get("omschrijving", naam))
         log.info("  %s (e=%s,n=%s): %d doorkomsten", h.get("omschrijving"), e, n, len(dcs))
         if dcs:
             lines = [h.get("omschrijving", naam)]
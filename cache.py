@@ -0,0 +1,155 @@
+"""baksteenservice - cache.py — thread-safe TTL cache with shared in-flight fetches."""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger("baksteenservice.cache")
+
+
+class _InFlight:
+    def __init__(self):
+        self.done   = threading.Event()
+        self.value  = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """
+    Process-wide cache: entries expire after `ttl` seconds, the oldest entries
+    are evicted beyond `max_items` (0 = unbounded). get_or_fetch() lets
+    concurrent callers for the same key share one fetch.
+    """
+
+    def __init__(self, ttl: float, max_items: int = 0):
+        self.ttl       = ttl
+        self.max_items = max_items
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, _InFlight]  = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.time():
+                del self._data[key]
+                return default
+            return value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while self.max_items and len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any],
+                     ttl: Optional[float] = None) -> Any:
+        """Cached value for key, or the result of fetch(). Exceptions are not cached."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] >= time.time():
+                return entry[1]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _InFlight()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            call.value = fetch()
+            self.put(key, call.value, ttl)
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+
+class PersistentTTLCache(TTLCache):
+    """
+    TTLCache with string keys and JSON values, reloaded (minus expired
+    entries) on construction. A put() only marks the cache dirty: a timer
+    writes `path` `save_delay` seconds later in the background, so a burst
+    of misses costs one write and never blocks or fails the caller. What is
+    still unwritten at exit is flushed by atexit.
+    """
+
+    def __init__(self, path: str, ttl: float, max_items: int = 0, save_delay: float = 5):
+        super().__init__(ttl, max_items)
+        self.path       = path
+        self.save_delay = save_delay
+        self._save_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Cache {self.path} unreadable: {e}")
+            return
+        now = time.time()
+        for key, expires, value in entries:
+            if expires >= now:
+                self._data[key] = (expires, value)
+        logger.info(f"Cache {os.path.basename(self.path)}: {len(self._data)} entries loaded")
+
+    def put(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        super().put(key, value, ttl)
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.save_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Writes the cache now if a put() is still waiting to be saved."""
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer is None:
+            return
+        timer.cancel()
+        try:
+            self.save()
+        except OSError as e:
+            logger.error(f"Cache {self.path} not saved: {e}")
+
+    def save(self) -> None:
+        with self._lock:
+            entries = [[k, exp, v] for k, (exp, v) in self._data.items()]
+        with self._save_lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
@@ -1,15 +1,24 @@
 """baksteenservice - config.py"""
 
+import os
 import re
 
 DEV_MODE = True
 
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
 MODEM_PORT = "/dev/ttyUSB0"
 MODEM_BAUD = 9600
 
 ALLOWED_SENDERS: list[str] = []
 SENDER_PATTERN = re.compile(r"^\+32\d+$")
 
+# logsetup.py: log.gz-rotatie op grootte en om middernacht; LOG_JSON = één JSON-object per regel
+LOG_DIR       = "/home/sander/baksteenservice/logs"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS   = 20
+LOG_JSON      = False
+
 SMS_MAX_DEFAULT = 160
 
 SMS_MAX: dict[str, int] = {
@@ -23,5 +32,60 @@ SMS_MAX: dict[str, int] = {
     "janee":     160,
 }
 
+# De Lijn haltecatalogus (bus.py): volledige herbouw om de zoveel seconden
+HALTES_VERVERS_SEC = 7 * 24 * 3600
+
+# weer.py: aantal populairste locaties dat elk uur vooraf opgehaald wordt
+WEER_VOORAF_TOP = 10
+
+# nieuws.py: seconden tussen twee (conditionele) RSS-pollings
+NIEUWS_INTERVAL = 300
+
+# OpenAI-compatibele chat-API; tools/llm_stub.py voor offline load-tests
+LLM_BASE_URL = "https://api.deepseek.com"
+LLM_MODEL    = "deepseek-chat"
+LLM_OPWARMEN = True   # warmup.py: openai laden en verbinden bij opstart (anders bij de eerste gpt)
+
+# llm.py: antwoordcache voor gpt/vertaling
+LLM_CACHE_TTL = 7 * 24 * 3600
+LLM_CACHE_MAX = 5000
+
+# llm.py: vertalingen binnen dit venster (s) worden per doeltaal gebundeld
+VERTALING_VENSTER   = 0.2
+VERTALING_MAX_BATCH = 10
+
+# apotheek.py: uren waarop de wachtdienst wisselt (resultaten gelden tot de volgende)
+APOTHEEK_WISSELUREN = (9, 22)
+APOTHEEK_LEEG_TTL   = 300   # s dat "geen wachtapotheek gevonden" bewaard blijft
+
+# returner.py: AT+CMGS timeouts (s) en herpogingen bij ERROR / +CMS ERROR.
+# Na de body wordt nooit herprobeerd op een timeout (SIM800: +CMGS tot 60 s).
+SMS_PROMPT_TIMEOUT = 5
+SMS_CMGS_TIMEOUT   = 60
+SMS_POGINGEN       = 3
+SMS_HERPROBEER_NA  = 5
+
+# metrics.py: Prometheus-tekst op http://127.0.0.1:<poort>/metrics (None = uit)
+METRICS_PORT = 9108
+
+# profiler.py: kill -USR1 start, kill -USR2 stopt en schrijft LOG_DIR/profile-*.txt
+PROFIEL_INTERVAL = 0.01
+PROFIEL_MAX_DUUR = 600   # stopt vanzelf na zoveel seconden
+
+# upstream.py: alle HTTP-calls naar tools/replay_server.py sturen (bv. "http://127.0.0.1:8090")
+UPSTREAM_REPLAY = None
+
+# ledger.py: calls per dag per API-sleutel uit secrets.py (None = geen limiet).
+# Vanaf WAARSCHUW_BIJ een waarschuwing, vanaf DEGRADEER_BIJ stopt het vooraf
+# ophalen, op 100% worden verdere calls geweigerd.
+API_DAGQUOTA = {
+    "OWM_API_KEY":         33000,   # 1M / maand
+    "GOOGLE_MAPS_API_KEY": 1300,    # ~40k directions / maand gratis tegoed
+    "DELIJN_API_KEY":      None,
+    "DEEPSEEK_API_KEY":    None,
+}
+API_WAARSCHUW_BIJ = 0.8
+API_DEGRADEER_BIJ = 0.95
+
 def sms_max(action: str) -> int:
     return SMS_MAX.get(action, SMS_MAX_DEFAULT)
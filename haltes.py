@@ -0,0 +1,173 @@
+"""baksteenservice - haltes.py
+Lokale catalogus van De Lijn-haltes: naam-index, coördinaten en lijnrichtingen.
+Wordt op schijf bewaard en door bus.py periodiek ververst.
+Exporteert: laad()                      -> bool
+            vervang(haltes)
+            zoek(naam, max_total)       -> List[dict]
+            lijnrichtingen(e, n)        -> Optional[List[dict]]
+            dichtbij(lat, lon, straal_m)  -> List[dict]
+            coordinaat(halte)           -> Optional[Tuple[float, float]]
+            geladen(), leeftijd()
+"""
+
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import config
+from normalise import normalise
+
+log = logging.getLogger("baksteenservice.haltes")
+
+CATALOGUS_FILE = os.path.join(config.DATA_DIR, "haltes.json")
+
+_CEL_GRADEN = 0.005                 # rastercel ~550 m (lat) x ~350 m (lon) in Belgie
+_M_PER_GRAAD = 111_320.0
+
+
+def coordinaat(h: dict) -> Optional[Tuple[float, float]]:
+    geo = h.get("geoCoordinaat") or {}
+    lat, lon = geo.get("latitude"), geo.get("longitude")
+    if lat is None or lon is None:
+        return None
+    return float(lat), float(lon)
+
+
+def _cel(lat: float, lon: float) -> Tuple[int, int]:
+    return int(math.floor(lat / _CEL_GRADEN)), int(math.floor(lon / _CEL_GRADEN))
+
+
+class _Catalogus:
+    """Onveranderlijke momentopname; wordt in zijn geheel vervangen bij verversing."""
+
+    def __init__(self, haltes: List[dict], bijgewerkt: float):
+        self.haltes     = haltes
+        self.bijgewerkt = bijgewerkt
+        self.per_sleutel: Dict[Tuple[str, str], dict] = {}
+        self.index:       Dict[str, Set[int]]         = {}
+        self.raster:      Dict[Tuple[int, int], List[int]] = {}
+        for i, h in enumerate(haltes):
+            self.per_sleutel[(str(h["entiteitnummer"]), str(h["haltenummer"]))] = h
+            tekst = "%s %s" % (h.get("omschrijving", ""), h.get("omschrijvingGemeente", ""))
+            for tok in normalise(tekst.replace("-", " ")).split():
+                self.index.setdefault(tok, set()).add(i)
+            c = coordinaat(h)
+            if c:
+                self.raster.setdefault(_cel(*c), []).append(i)
+        self.tokens = sorted(self.index)
+
+
+_lock = threading.Lock()
+_cat: Optional[_Catalogus] = None
+
+
+# ── opslag ───────────────────────────────────────────────────────────────────
+
+def laad() -> bool:
+    """Laadt de catalogus van schijf. Returnt False als er (nog) geen is."""
+    global _cat
+    if not os.path.exists(CATALOGUS_FILE):
+        return False
+    try:
+        with open(CATALOGUS_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        log.error("Haltecatalogus onleesbaar: %s", e)
+        return False
+    cat = _Catalogus(data.get("haltes", []), data.get("bijgewerkt", 0))
+    with _lock:
+        _cat = cat
+    log.info("Haltecatalogus geladen: %d haltes", len(cat.haltes))
+    return True
+
+
+def vervang(haltes: List[dict]) -> None:
+    """Zet een nieuw opgebouwde catalogus actief en schrijft hem naar schijf."""
+    global _cat
+    cat = _Catalogus(haltes, time.time())
+    with _lock:
+        _cat = cat
+    os.makedirs(config.DATA_DIR, exist_ok=True)
+    tmp = CATALOGUS_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"bijgewerkt": cat.bijgewerkt, "haltes": haltes}, f, ensure_ascii=False)
+    os.replace(tmp, CATALOGUS_FILE)
+    log.info("Haltecatalogus bewaard: %d haltes", len(haltes))
+
+
+def geladen() -> bool:
+    return _cat is not None and bool(_cat.haltes)
+
+
+def leeftijd() -> float:
+    """Seconden sinds de laatste volledige opbouw (inf als er geen catalogus is)."""
+    cat = _cat
+    return time.time() - cat.bijgewerkt if cat else float("inf")
+
+
+# ── opzoeken ─────────────────────────────────────────────────────────────────
+
+def zoek(naam: str, max_total: int = 30) -> List[dict]:
+    """Haltes waarvan naam + gemeente alle woorden van naam bevatten.
+    Het laatste woord mag een prefix zijn ('leuven stat' vindt 'Leuven Station')."""
+    cat = _cat
+    if cat is None:
+        return []
+    toks = normalise(naam.replace("-", " ")).split()
+    if not toks:
+        return []
+    treffers: Optional[Set[int]] = None
+    for i, tok in enumerate(toks):
+        hits = set(cat.index.get(tok, ()))
+        if i == len(toks) - 1:
+            j = bisect.bisect_right(cat.tokens, tok)
+            while j < len(cat.tokens) and cat.tokens[j].startswith(tok):
+                hits |= cat.index[cat.tokens[j]]
+                j += 1
+        treffers = hits if treffers is None else treffers & hits
+        if not treffers:
+            return []
+    doel = normalise(naam)
+
+    def _rang(i: int):
+        oms = normalise(cat.haltes[i].get("omschrijving", ""))
+        return (oms != doel, not oms.startswith(doel), len(oms), i)
+
+    return [cat.haltes[i] for i in sorted(treffers, key=_rang)[:max_total]]
+
+
+def lijnrichtingen(e: str, n: str) -> Optional[List[dict]]:
+    """Lijnrichtingen van halte (e, n), of None als de halte niet gekend is."""
+    cat = _cat
+    if cat is None:
+        return None
+    h = cat.per_sleutel.get((str(e), str(n)))
+    return None if h is None else h.get("lijnrichtingen", [])
+
+
+def dichtbij(lat: float, lon: float, straal_m: float = 400, max_aantal: int = 8) -> List[dict]:
+    """Haltes binnen straal_m van (lat, lon), dichtste eerst."""
+    cat = _cat
+    if cat is None:
+        return []
+    cos_lat = math.cos(math.radians(lat))
+    d_lat   = int(math.ceil(straal_m / (_M_PER_GRAAD * _CEL_GRADEN)))
+    d_lon   = int(math.ceil(straal_m / (_M_PER_GRAAD * cos_lat * _CEL_GRADEN)))
+    c_lat, c_lon = _cel(lat, lon)
+    gevonden: List[Tuple[float, int]] = []
+    for i_lat in range(c_lat - d_lat, c_lat + d_lat + 1):
+        for i_lon in range(c_lon - d_lon, c_lon + d_lon + 1):
+            for i in cat.raster.get((i_lat, i_lon), ()):
+                h_lat, h_lon = coordinaat(cat.haltes[i])
+                dy = (h_lat - lat) * _M_PER_GRAAD
+                dx = (h_lon - lon) * _M_PER_GRAAD * cos_lat
+                afstand = math.hypot(dx, dy)
+                if afstand <= straal_m:
+                    gevonden.append((afstand, i))
+    gevonden.sort()
+    return [cat.haltes[i] for _, i in gevonden[:max_aantal]]
@@ -0,0 +1,92 @@
+"""baksteenservice - hotreload.py — re-reads config.py and secrets.py on SIGHUP.
+
+    kill -HUP <pid>     (systemctl reload baksteenservice)
+
+Both files are executed into a fresh namespace first; if that fails, or a
+setting changes type, nothing is applied. Otherwise the changed UPPERCASE
+names are written into the live modules in one dict.update() (string keys,
+so no other thread runs halfway through it), and the state derived from
+them is rebuilt: the sender allowlist (listener), the De Lijn header (bus)
+and the LLM client (llm). Everything else reads config at call time, so
+SMS_MAX, timeouts, quotas, UPSTREAM_REPLAY etc. apply to the next message.
+
+The serial session, queued replies and messages being handled are not
+touched. Settings in RESTART_ONLY are reported but left as they are.
+"""
+import importlib.util
+import logging
+import threading
+from types import ModuleType
+from typing import Dict
+
+import bus
+import config
+import listener
+import llm
+import secrets as _secrets
+
+logger = logging.getLogger("baksteenservice.hotreload")
+
+# Read once at start-up (modem, paths, log handlers, the metrics socket, the answer cache).
+RESTART_ONLY = frozenset({
+    "DEV_MODE", "DATA_DIR", "MODEM_PORT", "MODEM_BAUD",
+    "LOG_DIR", "LOG_MAX_BYTES", "LOG_BACKUPS", "LOG_JSON",
+    "METRICS_PORT", "LLM_CACHE_TTL", "LLM_CACHE_MAX",
+})
+
+_lock = threading.Lock()
+
+
+def _settings(module: ModuleType) -> Dict[str, object]:
+    return {k: v for k, v in vars(module).items() if k.isupper()}
+
+
+def _read(module: ModuleType) -> Dict[str, object]:
+    """Executes module's source file into a new, unregistered module and returns its settings."""
+    spec = importlib.util.spec_from_file_location(f"_reload_{module.__name__}", module.__file__)
+    fresh = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(fresh)
+    return _settings(fresh)
+
+
+def _changes(module: ModuleType, new: Dict[str, object]) -> Dict[str, object]:
+    old = _settings(module)
+    changed = {k: v for k, v in new.items() if k not in old or old[k] != v}
+    for k, v in changed.items():
+        if k in old and None not in (old[k], v) and type(old[k]) is not type(v):
+            raise TypeError(f"{module.__name__}.{k}: {type(old[k]).__name__} -> {type(v).__name__}")
+    return changed
+
+
+def reload() -> None:
+    with _lock:
+        try:
+            conf = _changes(config, _read(config))
+            keys = _changes(_secrets, _read(_secrets))
+        except Exception as e:
+            logger.error(f"Config reload aborted, nothing changed: {e}")
+            return
+
+        skipped = sorted(k for k in conf if k in RESTART_ONLY)
+        conf    = {k: v for k, v in conf.items() if k not in RESTART_ONLY}
+        vars(config).update(conf)
+        vars(_secrets).update(keys)
+
+        if "ALLOWED_SENDERS" in conf:
+            listener.load_allowlist()
+        if "DELIJN_API_KEY" in keys:
+            bus.laad_sleutel()
+        if "DEEPSEEK_API_KEY" in keys or "LLM_BASE_URL" in conf:
+            llm.reset_client()
+
+    if conf or keys:
+        logger.info("Config reloaded: " + ", ".join(sorted(conf) + [f"{k} (secret)" for k in sorted(keys)]))
+    else:
+        logger.info("Config reloaded: no changes")
+    if skipped:
+        logger.warning(f"Changed but only applied after a restart: {', '.join(skipped)}")
+
+
+def handle_signal(sig, frame) -> None:
+    """SIGHUP: reload in a thread, so the handler never waits on a lock the main thread holds."""
+    threading.Thread(target=reload, name="reload", daemon=True).start()
@@ -0,0 +1,226 @@
+"""baksteenservice - ledger.py — upstream call ledger and daily API-key budgets.
+
+Every upstream request (upstream.tracked / upstream.get) becomes a Call. Calls
+made while handling an SMS are collected in that message's Ledger (see
+message()) and logged as one line when it is done. Calls to hosts that use a
+key from secrets.py are also counted per key per day against
+config.API_DAGQUOTA:
+  - at API_WAARSCHUW_BIJ of the quota a warning is logged (once per day),
+  - from API_DEGRADEER_BIJ degraded(key) is True, and optional background
+    work (prefetching, catalogue rebuilds) stops,
+  - at the quota itself check() raises QuotaExhausted for further calls.
+Counters survive restarts via DATA_DIR/api_counts.json.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+import config
+import metrics
+
+logger = logging.getLogger("baksteenservice.ledger")
+
+COUNTS_FILE = os.path.join(config.DATA_DIR, "api_counts.json")
+
+# host -> name of the key in secrets.py that pays for it
+KEY_FOR_HOST = {
+    "api.weatherapi.com":  "OWM_API_KEY",
+    "maps.googleapis.com": "GOOGLE_MAPS_API_KEY",
+    "api.delijn.be":       "DELIJN_API_KEY",
+    "api.deepseek.com":    "DEEPSEEK_API_KEY",
+}
+
+_SAVE_EVERY = 30   # seconds between writes of the daily counters
+
+
+class QuotaExhausted(requests.RequestException):
+    """The daily budget for an API key is used up; raised instead of calling it."""
+
+
+class Call:
+
+    def __init__(self, host: str, key: Optional[str]):
+        self.host    = host
+        self.key     = key
+        self.status: object = None   # HTTP status, or "error"
+        self.bytes: Optional[int] = None
+        self.seconds = 0.0
+
+
+class Ledger:
+
+    def __init__(self, intent: str):
+        self.intent = intent
+        self.calls: List[Call] = []
+        self._lock  = threading.Lock()
+
+    def add(self, call: Call) -> None:
+        with self._lock:
+            self.calls.append(call)
+
+    def summary(self) -> str:
+        per_host = Counter(c.host for c in self.calls)
+        size     = sum(c.bytes or 0 for c in self.calls)
+        secs     = sum(c.seconds for c in self.calls)
+        errors   = sum(1 for c in self.calls if c.status == "error" or (isinstance(c.status, int) and c.status >= 400))
+        hosts    = ", ".join(f"{h} x{n}" for h, n in per_host.most_common())
+        return (f"{len(self.calls)} upstream calls ({hosts}), {size / 1024:.1f} KB, "
+                f"{secs:.2f}s in calls" + (f", {errors} failed" if errors else ""))
+
+
+_current: "contextvars.ContextVar[Optional[Ledger]]" = contextvars.ContextVar("ledger", default=None)
+
+_lock   = threading.Lock()
+_day    = date.today().isoformat()
+_counts: Counter = Counter()
+_warned: set     = set()
+_saved  = 0.0
+
+_save_lock = threading.Lock()   # one writer at a time; never held together with _lock
+_written   = 0.0                # _saved of the snapshot last on disk
+
+
+
+# ── Per message ────────────────────────────────────────────────────────────────
+
+
+@contextmanager
+def message(intent: str):
+    """Collects the upstream calls made inside the block (also from copied contexts)."""
+    ledger = Ledger(intent)
+    token  = _current.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _current.reset(token)
+        if ledger.calls:
+            logger.info(f"[{intent}] {ledger.summary()}")
+            for c in ledger.calls:
+                logger.debug(f"  {c.host} {c.status} {c.bytes or '-'}B {c.seconds:.3f}s")
+
+
+def record(call: Call) -> None:
+    ledger = _current.get()
+    if ledger is not None:
+        ledger.add(call)
+    if call.key:
+        _count(call.key)
+
+
+
+# ── Daily budgets ──────────────────────────────────────────────────────────────
+
+
+def _load() -> None:
+    try:
+        with open(COUNTS_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read {COUNTS_FILE}: {e}")
+        return
+    if data.get("day") == _day:
+        _counts.update(data.get("counts", {}))
+
+
+def _snapshot() -> Tuple[float, dict]:
+    """The counters to save, taken under _lock (the caller holds it)."""
+    global _saved
+    _saved = time.time()
+    return _saved, {"day": _day, "counts": dict(_counts)}
+
+
+def _save(snapshot: Tuple[float, dict]) -> None:
+    """Writes a _snapshot() outside _lock, so counting never waits on the disk."""
+    global _written
+    taken, data = snapshot
+    with _save_lock:
+        if taken < _written:
+            return  # a newer snapshot is already on disk
+        _written = taken
+        tmp = COUNTS_FILE + ".tmp"
+        try:
+            os.makedirs(config.DATA_DIR, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, COUNTS_FILE)
+        except OSError as e:
+            logger.warning(f"Could not write {COUNTS_FILE}: {e}")
+
+
+def _roll_over() -> None:
+    """Starts new counters at midnight; the caller holds _lock."""
+    global _day
+    today = date.today().isoformat()
+    if today != _day:
+        logger.info(f"API calls on {_day}: " + (", ".join(f"{k} {n}" for k, n in _counts.items()) or "none"))
+        _day = today
+        _counts.clear()
+        _warned.clear()
+
+
+def _count(key: str) -> None:
+    snapshot = None
+    with _lock:
+        _roll_over()
+        _counts[key] += 1
+        n     = _counts[key]
+        quota = config.API_DAGQUOTA.get(key)
+        if quota and n >= quota * config.API_WAARSCHUW_BIJ and key not in _warned:
+            _warned.add(key)
+            logger.warning(f"{key}: {n} of {quota} calls used today")
+        if time.time() - _saved >= _SAVE_EVERY:
+            snapshot = _snapshot()
+    if snapshot:
+        _save(snapshot)
+
+
+def key_for(host: str) -> Optional[str]:
+    return KEY_FOR_HOST.get(host)
+
+
+def usage(key: str) -> float:
+    """Fraction of today's quota used for key (0 if it has no quota)."""
+    quota = config.API_DAGQUOTA.get(key)
+    if not quota:
+        return 0.0
+    with _lock:
+        _roll_over()
+        return _counts[key] / quota
+
+
+def degraded(key: str) -> bool:
+    """True once key is close enough to its quota that optional calls should stop."""
+    return usage(key) >= config.API_DEGRADEER_BIJ
+
+
+def check(key: Optional[str]) -> None:
+    """Raises QuotaExhausted if key has used its daily quota."""
+    if key and usage(key) >= 1.0:
+        metrics.inc("baksteen_quota_rejected_total", key=key)
+        raise QuotaExhausted(f"daily quota for {key} used up ({config.API_DAGQUOTA[key]} calls)")
+
+
+def counts() -> Dict[str, int]:
+    with _lock:
+        _roll_over()
+        return dict(_counts)
+
+
+def flush() -> None:
+    with _lock:
+        snapshot = _snapshot()
+    _save(snapshot)
+
+
+_load()
@@ -1,35 +1,43 @@
 import logging
+import re
 import threading
 import time
-import unicodedata
 from typing import Dict, List
 
 
 import config
-from config import ALLOWED_SENDERS, SENDER_PATTERN
+import tracker
+from translit import strip_accents
 
 
 logger = logging.getLogger("baksteenservice.listener")
 
 
+# Text-mode status reports: +CDS: <fo>,<mr>,... ,<st> (unsolicited) and stored
+# ones in AT+CMGL: +CMGL: <index>,<stat>,<fo>,<mr>,... ,<st>
+_CDS_RE       = re.compile(r"^\+CDS:\s*\d+,(\d+),.*,(\d+)$")
+_CMGL_CDS_RE  = re.compile(r'^\+CMGL:\s*(\d+),"[^"]*",\d+,(\d+),.*,(\d+)$')
+
+
+
+# config.ALLOWED_SENDERS as a set; rebuilt by load_allowlist() on a config reload
+_allowed: frozenset = frozenset(config.ALLOWED_SENDERS)
+
+
+def load_allowlist() -> None:
+    global _allowed
+    _allowed = frozenset(config.ALLOWED_SENDERS)
+
 
 def is_allowed(sender: str) -> bool:
-    if not SENDER_PATTERN.match(sender):
+    if not config.SENDER_PATTERN.match(sender):
         return False
-    if ALLOWED_SENDERS and sender not in ALLOWED_SENDERS:
+    if _allowed and sender not in _allowed:
         return False
     return True
 
 
 
-def strip_accents(text: str) -> str:
-    return "".join(
-        c for c in unicodedata.normalize("NFD", text)
-        if unicodedata.category(c) != "Mn"
-    )
-
-
-
 def decode_text(text: str) -> str:
     t = text.strip()
     if (
@@ -50,7 +58,9 @@ class SMSListener:
 
     def __init__(self):
         self.pending: List[Dict] = []
-        self.lock = threading.Lock()
+        self.lock = threading.Lock()          # pending
+        self.serial_lock = threading.Lock()   # the modem port: poll_loop and the returner
+        self.poll_waiting = threading.Event() # set while poll_loop waits for serial_lock
         self.active = False
         self.thread = None
         self.ser = None
@@ -67,8 +77,10 @@ class SMSListener:
         time.sleep(0.3)
         self.ser.reset_input_buffer()
         self.at("AT\r\n")
+        self.at("ATE0\r\n")                # no echo: a reply body must never look like a result
         self.at("AT+CMGF=1\r\n")
-        self.at("AT+CNMI=0,0,0,0,0\r\n")
+        self.at("AT+CSMP=49,167,0,0\r\n")  # request status reports, validity 24h
+        self.at("AT+CNMI=0,0,0,2,0\r\n")   # store status reports, read via CMGL
         self.at('AT+CMGDA="DEL ALL"\r\n', wait=2)
         self.active = True
         self.thread = threading.Thread(target=self.poll_loop, daemon=True)
@@ -114,10 +126,11 @@ class SMSListener:
     def poll_loop(self):
         while self.active:
             time.sleep(1)
-            if self.lock.locked():
-                continue
             try:
-                messages = self._read_all_messages()
+                self.poll_waiting.set()       # the returner yields between two sends
+                with self.serial_lock:
+                    self.poll_waiting.clear()
+                    messages = self._read_all_messages()
                 for msg in messages:
                     with self.lock:
                         self.pending.append(msg)
@@ -139,7 +152,14 @@ class SMSListener:
         i = 0
         while i < len(lines):
             line = lines[i]
-            if line.startswith("+CMGL:"):
+            stored = _CMGL_CDS_RE.match(line)
+            cds    = _CDS_RE.match(line)
+            if stored:
+                indices.append(int(stored.group(1)))
+                tracker.status_report(int(stored.group(2)), int(stored.group(3)))
+            elif cds:
+                tracker.status_report(int(cds.group(1)), int(cds.group(2)))
+            elif line.startswith("+CMGL:"):
                 try:
                     parts  = line.split(",")
                     index  = int(parts[0].replace("+CMGL:", "").strip())
@@ -0,0 +1,291 @@
+"""baksteenservice - llm.py
+Chat completions for the gpt/vertaling intents, streamed and cut off at the SMS budget.
+Repeat questions are answered from a persistent cache (see answer()), and
+concurrent translations are micro-batched into one call (TranslationBatcher).
+The openai package takes ~0.5 s to import, so it is only loaded when the
+client is first needed (get_client()), not at start-up.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+import config
+import upstream
+from cache import PersistentTTLCache
+from normalise import normalise
+
+logger = logging.getLogger("baksteenservice.llm")
+
+# Conservative for NL/FR text (~3.5-4 chars per token); the margin covers a
+# sentence that straddles the limit, so the model is never cut mid-word by max_tokens.
+_CHARS_PER_TOKEN = 3
+_TOKEN_MARGIN    = 16
+
+_SENTENCE_END_RE = re.compile(r"[.!?](?=\s|$)|\n")
+_CODE_FENCE_RE   = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+ANSWERS_FILE = os.path.join(config.DATA_DIR, "antwoorden.json")
+
+
+# Questions whose answer depends on when they are asked are never cached.
+_TIME_SENSITIVE_RE = re.compile(
+    r"\b(vandaag|morgen|gisteren|nu|momenteel|actueel|actuele|laatste|huidige?|"
+    r"deze (week|maand)|dit jaar|weer|score|stand|koers|prijs|live|nieuws|"
+    r"today|tomorrow|yesterday|now|current|latest|"
+    r"aujourd'hui|demain|maintenant|actuel|actuelle|dernier|derniere|"
+    r"(19|20)\d\d)\b",
+    re.IGNORECASE,
+)
+
+_answers: Optional[PersistentTTLCache] = None
+_answers_lock = threading.Lock()
+
+_client      = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The OpenAI client for LLM_BASE_URL, built (and openai imported) on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            import secrets as _secrets
+            _client = OpenAI(api_key=_secrets.DEEPSEEK_API_KEY, base_url=config.LLM_BASE_URL)
+        return _client
+
+
+def reset_client() -> None:
+    """Drops the client so the next call builds one with the current key and LLM_BASE_URL."""
+    global _client
+    with _client_lock:
+        _client = None
+
+
+def warm_up() -> None:
+    """Imports openai and opens the client's connection (GET /models costs no tokens)."""
+    try:
+        get_client().with_options(timeout=5, max_retries=0).models.list()
+    except Exception as e:
+        logger.debug(f"LLM warm-up: {e}")
+
+
+def max_tokens(max_len: int) -> int:
+    return max_len // _CHARS_PER_TOKEN + _TOKEN_MARGIN
+
+
+def cut(text: str, max_len: int) -> str:
+    """Fit text into max_len, preferring the last complete sentence."""
+    text = text.strip()
+    if len(text) <= max_len:
+        return text
+    head = text[:max_len]
+    ends = [m.end() for m in _SENTENCE_END_RE.finditer(head)]
+    if ends and ends[-1] >= max_len // 2:
+        return head[:ends[-1]].strip()
+    head = text[:max_len - 3]
+    if " " in head:
+        head = head.rsplit(" ", 1)[0]
+    return head + "..."
+
+
+def complete(client, messages: List[Dict], max_len: int) -> str:
+    """
+    Streams a completion and stops reading once max_len characters are in:
+    tokens beyond the SMS budget are neither waited for nor generated.
+    """
+    parts: List[str] = []
+    received = 0
+    with upstream.tracked(config.LLM_BASE_URL) as call:
+        stream = client.chat.completions.create(
+            model=config.LLM_MODEL, stream=True, max_tokens=max_tokens(max_len), messages=messages)
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                parts.append(delta)
+                received += len(delta)
+                if received > max_len:
+                    logger.info(f"Budget of {max_len} chars reached, closing stream")
+                    break
+        finally:
+            stream.close()
+        call.status, call.bytes = 200, received
+    return cut("".join(parts), max_len)
+
+
+
+# ── Answer cache ───────────────────────────────────────────────────────────────
+
+
+def _answer_cache() -> PersistentTTLCache:
+    global _answers
+    with _answers_lock:
+        if _answers is None:
+            _answers = PersistentTTLCache(ANSWERS_FILE, ttl=config.LLM_CACHE_TTL,
+                                          max_items=config.LLM_CACHE_MAX)
+        return _answers
+
+
+def _cached(messages: List[Dict], max_len: int, lang: str, fetch):
+    if is_time_sensitive(messages[-1]["content"]):
+        return fetch()
+    return _answer_cache().get_or_fetch(_cache_key(messages, lang, max_len), fetch)
+
+
+def is_time_sensitive(prompt: str) -> bool:
+    return bool(_TIME_SENSITIVE_RE.search(prompt))
+
+
+def _cache_key(messages: List[Dict], lang: str, max_len: int) -> str:
+    system  = next((m["content"] for m in messages if m["role"] == "system"), "")
+    version = hashlib.sha1(system.encode("utf-8")).hexdigest()[:8]
+    prompt  = normalise(messages[-1]["content"]).rstrip(" ?!.")
+    return f"{version}|{lang}|{max_len}|{prompt}"
+
+
+def answer(client, messages: List[Dict], max_len: int, lang: str = "") -> str:
+    """
+    complete(), cached on the normalised prompt, target language, system
+    prompt (hashed, so editing the prompt invalidates old answers) and budget.
+    Time-sensitive prompts bypass the cache.
+    """
+    return _cached(messages, max_len, lang, lambda: complete(client, messages, max_len))
+
+
+
+# ── Translation batching ───────────────────────────────────────────────────────
+
+
+def translation_messages(text: str, lang_full: str) -> List[Dict]:
+    return [
+        {"role": "system", "content": f"Translate to {lang_full}. Return ONLY the translation."},
+        {"role": "user",   "content": text},
+    ]
+
+
+class _Job:
+    def __init__(self, text: str, max_len: int):
+        self.text    = text
+        self.max_len = max_len
+        self.result: Optional[str] = None
+        self.done    = threading.Event()
+
+
+class TranslationBatcher:
+    """
+    Collects translation requests for `window` seconds (or until `max_batch`
+    are waiting) and sends them as one JSON multi-item prompt per target
+    language. A request that finds nothing pending or in flight for its
+    language does not wait: it is sent at once as a normal streamed call, and
+    the window only starts for requests arriving while that call runs. A batch
+    of one, or one whose reply cannot be parsed, falls back to the same
+    streamed call from the caller's own thread. Left as None,
+    window / max_batch / client follow config (VERTALING_*) and get_client().
+    """
+
+    def __init__(self, window: Optional[float] = None, max_batch: Optional[int] = None, client=None):
+        self._client    = client
+        self._window    = window
+        self._max_batch = max_batch
+        self._pending: Dict[str, List[_Job]] = {}
+        self._in_flight: Dict[str, int] = {}   # lang_full -> calls running
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self._client or get_client()
+
+    @property
+    def window(self) -> float:
+        return config.VERTALING_VENSTER if self._window is None else self._window
+
+    @property
+    def max_batch(self) -> int:
+        return config.VERTALING_MAX_BATCH if self._max_batch is None else self._max_batch
+
+    def translate(self, text: str, lang: str, lang_full: str, max_len: int) -> str:
+        messages = translation_messages(text, lang_full)
+        return _cached(messages, max_len, lang, lambda: self._batched(text, lang_full, max_len))
+
+    def _batched(self, text: str, lang_full: str, max_len: int) -> str:
+        job = _Job(text, max_len)
+        with self._lock:
+            alone = lang_full not in self._pending and not self._in_flight.get(lang_full)
+            if alone:
+                self._begin(lang_full)
+            else:
+                batch = self._pending.setdefault(lang_full, [])
+                batch.append(job)
+                if len(batch) == 1:
+                    timer = threading.Timer(self.window, self._flush, args=(lang_full, batch))
+                    timer.daemon = True
+                    timer.start()
+                full = len(batch) >= self.max_batch
+        if alone:
+            try:
+                return complete(self.client, translation_messages(text, lang_full), max_len)
+            finally:
+                self._end(lang_full)
+        if full:
+            self._flush(lang_full, batch)
+        job.done.wait()
+        if job.result is None:
+            return complete(self.client, translation_messages(text, lang_full), max_len)
+        return job.result
+
+    def _flush(self, lang_full: str, batch: List[_Job]) -> None:
+        with self._lock:
+            if self._pending.get(lang_full) is not batch:
+                return  # already flushed because it filled up
+            del self._pending[lang_full]
+            self._begin(lang_full)
+        try:
+            if len(batch) > 1:
+                try:
+                    for job, result in zip(batch, self._send(lang_full, batch)):
+                        job.result = result
+                    logger.info(f"Batched {len(batch)} translations to {lang_full} in one call")
+                except Exception as e:
+                    logger.warning(f"Translation batch of {len(batch)} failed, falling back: {e}")
+        finally:
+            self._end(lang_full)
+            for job in batch:
+                job.done.set()
+
+    def _begin(self, lang_full: str) -> None:
+        """Counts a call for lang_full as running; caller holds _lock."""
+        self._in_flight[lang_full] = self._in_flight.get(lang_full, 0) + 1
+
+    def _end(self, lang_full: str) -> None:
+        with self._lock:
+            n = self._in_flight[lang_full] - 1
+            if n:
+                self._in_flight[lang_full] = n
+            else:
+                del self._in_flight[lang_full]
+
+    def _send(self, lang_full: str, batch: List[_Job]) -> List[str]:
+        with upstream.tracked(config.LLM_BASE_URL) as call:
+            r = self.client.chat.completions.create(
+                model=config.LLM_MODEL, stream=False,
+                max_tokens=sum(max_tokens(j.max_len) for j in batch),
+                messages=[
+                    {"role": "system", "content": (
+                        f"Translate each item of the JSON array to {lang_full}. "
+                        f"Return ONLY a JSON array of strings with the translations, "
+                        f"in the same order and with the same number of items."
+                    )},
+                    {"role": "user", "content": json.dumps([j.text for j in batch], ensure_ascii=False)},
+                ])
+            call.status = 200
+        content = _CODE_FENCE_RE.sub("", r.choices[0].message.content.strip())
+        items   = json.loads(content)
+        if not isinstance(items, list) or len(items) != len(batch):
+            raise ValueError(f"expected {len(batch)} items, got {content[:80]!r}")
+        return [cut(str(t), j.max_len) for t, j in zip(items, batch)]
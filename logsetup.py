@@ -0,0 +1,130 @@
+"""baksteenservice - logsetup.py — queue-based logging with rotation.
+
+Log calls only put the record on a queue (QueueHandler); one background
+thread (QueueListener) formats it and writes it to stdout and to
+LOG_DIR/baksteenservice.log. The file rotates at LOG_MAX_BYTES and at
+midnight; rotated files are gzipped in that thread, keeping LOG_BACKUPS.
+With LOG_JSON every file line is a JSON object instead of plain text.
+"""
+import atexit
+import copy
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+from datetime import date
+from typing import Optional
+
+import config
+
+FORMAT   = "%(asctime)s [%(levelname)s] %(name)s - %(message)s"
+LOG_FILE = "baksteenservice.log"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, thread, msg (+ exc)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts":     self.formatTime(record),
+            "level":  record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg":    record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler.prepare() merges the traceback into msg; this one keeps it
+    apart in exc_text, so JsonFormatter can write it as "exc" and the text
+    formatter still appends it. exc_info is dropped (no frames on the queue).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class RotatingGzipHandler(logging.handlers.RotatingFileHandler):
+    """Size-based rotation that also rolls over on a new day; backups are .N.gz."""
+
+    def __init__(self, filename: str, max_bytes: int, backups: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        self.namer   = lambda name: name + ".gz"
+        self.rotator = self._gzip
+        self._day    = self._file_day()
+
+    def _file_day(self) -> date:
+        try:
+            return date.fromtimestamp(os.path.getmtime(self.baseFilename))
+        except OSError:
+            return date.today()
+
+    def shouldRollover(self, record) -> int:
+        if date.today() != self._day and os.path.exists(self.baseFilename) \
+                and os.path.getsize(self.baseFilename) > 0:
+            return 1
+        return super().shouldRollover(record)
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self._day = date.today()
+
+    @staticmethod
+    def _gzip(source: str, dest: str) -> None:
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
+def setup(level: int = logging.INFO) -> str:
+    """Installs the queue handler on the root logger and starts the writer; returns the log path."""
+    global _listener
+    os.makedirs(config.LOG_DIR, exist_ok=True)
+    path = os.path.join(config.LOG_DIR, LOG_FILE)
+
+    text = logging.Formatter(FORMAT)
+    to_file = RotatingGzipHandler(path, config.LOG_MAX_BYTES, config.LOG_BACKUPS)
+    to_file.setFormatter(JsonFormatter() if config.LOG_JSON else text)
+    to_stdout = logging.StreamHandler(sys.stdout)
+    to_stdout.setFormatter(text)
+
+    q: "queue.SimpleQueue" = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(_QueueHandler(q))
+
+    _listener = logging.handlers.QueueListener(q, to_file, to_stdout, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+    return path
+
+
+def shutdown() -> None:
+    """Writes out what is still queued and closes the handlers."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for h in listener.handlers:
+        h.close()
@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 """baksteenservice - main.py"""
-import glob
+import time
+
+_T0 = time.perf_counter()   # before the imports: startup is measured from here
+
 import logging
-import os
 import signal
-import sys
 import threading
 
 from listener import SMSListener
@@ -12,35 +13,22 @@ from analyser import SMSAnalyser
 from action import ActionHandler
 from returner import SMSReturner
 import config
+import hotreload
+import ledger
+import logsetup
+import metrics
+import nieuws
+import profiler
+import tracker
+import warmup
+import weer
 
 
-def get_next_log_path(log_dir: str) -> str:
-    os.makedirs(log_dir, exist_ok=True)
-    existing = glob.glob(os.path.join(log_dir, "log*.log"))
-    numbers = []
-    for f in existing:
-        try:
-            numbers.append(int(os.path.basename(f).replace("log", "").replace(".log", "")))
-        except ValueError:
-            pass
-    next_num = max(numbers, default=0) + 1
-    return os.path.join(log_dir, f"log{next_num}.log")
-
-
-LOG_DIR = "/home/sander/baksteenservice/logs"
-log_path = get_next_log_path(LOG_DIR)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
-    handlers=[
-        logging.FileHandler(log_path),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+log_path = logsetup.setup()
 
 logger = logging.getLogger("baksteenservice.main")
 logger.info(f"Logging to {log_path}")
+metrics.observe("baksteen_startup_seconds", time.perf_counter() - _T0, phase="imports")
 
 _running = True
 _listener = None  # global ref so signal handler can stop it immediately
@@ -57,10 +45,18 @@ def handle_signal(sig, frame):
 def handle_message(msg, analyser, action_handler, returner):
     try:
         logger.info(f"Message from {msg['sender']}: {msg['text']}")
+        trace = tracker.start(msg)
+        t = time.perf_counter()
         analysis = analyser.analyse(msg)
-        action_result = action_handler.execute(analysis)
-        reply = returner.build_reply(analysis, action_result)
-        returner.send(msg["sender"], reply)
+        intent = trace.intent = analysis.get("intent", "unknown")
+        metrics.observe("baksteen_stage_seconds", time.perf_counter() - t, stage="analyse", intent=intent)
+        with metrics.timer("baksteen_stage_seconds", stage="execute", intent=intent), ledger.message(intent):
+            action_result = action_handler.execute(analysis)
+        with metrics.timer("baksteen_stage_seconds", stage="build_reply", intent=intent):
+            reply = returner.build_reply(analysis, action_result)
+        with metrics.timer("baksteen_stage_seconds", stage="send", intent=intent):
+            returner.send(msg["sender"], reply, trace=trace)
+        metrics.inc("baksteen_messages_total", intent=intent, success=action_result.get("success", False))
     except Exception as e:
         logger.error(f"Error handling message from {msg['sender']}: {e}")
 
@@ -70,6 +66,9 @@ def main():
 
     signal.signal(signal.SIGTERM, handle_signal)
     signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGUSR1, profiler.start)
+    signal.signal(signal.SIGUSR2, profiler.stop)
+    signal.signal(signal.SIGHUP, hotreload.handle_signal)
 
     mode = "TERMINAL (dev)" if config.DEV_MODE else f"SIM800C on {config.MODEM_PORT}"
     logger.info(f"baksteenservice starting — mode: {mode}")
@@ -78,20 +77,41 @@ def main():
     analyser = SMSAnalyser()
     action_handler = ActionHandler()
     returner = SMSReturner(listener=_listener)
+    metrics.start_server()
+    warmup.start()             # runs alongside the modem init below
+    weer.start_verversing()
+    nieuws.start_poller()
     _listener.start()
+    returner.start()
+    ready = time.perf_counter() - _T0
+    metrics.observe("baksteen_startup_seconds", ready, phase="ready")
+    logger.info(f"Accepting messages {ready:.2f}s after start")
+    first = True
 
     try:
         while _running:
             msg = _listener.get_next_message()
             if msg is None:
                 break
+            if first:
+                first = False
+                since = time.perf_counter() - _T0
+                metrics.observe("baksteen_startup_seconds", since, phase="first_message")
+                logger.info(f"First message {since:.2f}s after start")
             t = threading.Thread(target=handle_message, args=(msg, analyser, action_handler, returner), daemon=True)
             t.start()
     except KeyboardInterrupt:
         pass
     finally:
+        returner.stop()
         _listener.stop()
+        for line in tracker.summary():
+            logger.info(f"Timings {line}")
+        for line in metrics.summary():
+            logger.info(f"Latency {line}")
+        ledger.flush()
         logger.info("baksteenservice stopped.")
+        logsetup.shutdown()
 
 
 if __name__ == "__main__":
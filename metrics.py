@@ -0,0 +1,158 @@
+"""baksteenservice - metrics.py — in-process latency histograms and counters.
+
+observe()/timer() feed fixed-bucket histograms keyed on metric name and
+labels; inc() counts events such as errors. render() produces Prometheus
+text format, served on 127.0.0.1:config.METRICS_PORT/metrics by
+start_server(), and summary() gives p50/p95/p99 estimates for the log.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+import config
+
+logger = logging.getLogger("baksteenservice.metrics")
+
+# Upper bounds in seconds, from a cached answer to a slow LLM call or SMS delivery.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _Histogram:
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # last slot: +Inf
+        self.sum    = 0.0
+        self.count  = 0
+
+    def add(self, v: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, v)] += 1
+        self.sum   += v
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Linear interpolation inside the bucket, like Prometheus' histogram_quantile."""
+        rank, seen = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                if i == len(BUCKETS):
+                    return BUCKETS[-1]
+                lower = BUCKETS[i - 1] if i else 0.0
+                return lower + (BUCKETS[i] - lower) * (rank - seen) / c
+            seen += c
+        return 0.0
+
+
+_lock = threading.Lock()
+_histograms: Dict[_Key, _Histogram] = {}
+_counters:   Dict[_Key, int] = {}
+
+
+def _key(name: str, labels: Dict[str, str]) -> _Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = _Histogram()
+        h.add(seconds)
+
+
+def inc(name: str, n: int = 1, **labels) -> None:
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+
+@contextmanager
+def timer(name: str, **labels):
+    """Observes the duration of the block; an exception also bumps the matching *_errors_total."""
+    t = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc(name.replace("_seconds", "") + "_errors_total", **labels)
+        raise
+    finally:
+        observe(name, time.perf_counter() - t, **labels)
+
+
+
+# ── Output ─────────────────────────────────────────────────────────────────────
+
+
+def _fmt_labels(labels, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels] + ([extra] if extra else [])
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render() -> str:
+    with _lock:
+        hists    = sorted(_histograms.items())
+        counters = sorted(_counters.items())
+        lines: List[str] = []
+        typed = set()
+        for (name, labels), h in hists:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cum = 0
+            for bound, c in zip(BUCKETS + ("+Inf",), h.counts):
+                cum += c
+                le = 'le="%s"' % bound
+                lines.append(f"{name}_bucket{_fmt_labels(labels, le)} {cum}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {h.sum:.6f}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {h.count}")
+        for (name, labels), n in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_fmt_labels(labels)} {n}")
+    return "\n".join(lines) + "\n"
+
+
+def summary() -> List[str]:
+    """One line per histogram: count and p50/p95/p99 in seconds."""
+    with _lock:
+        return [f"{name}{_fmt_labels(labels)} n={h.count} "
+                f"p50={h.quantile(.5):.3f} p95={h.quantile(.95):.3f} p99={h.quantile(.99):.3f}"
+                for (name, labels), h in sorted(_histograms.items())]
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt, *args)
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_server() -> None:
+    """Serves /metrics on localhost if config.METRICS_PORT is set."""
+    if not config.METRICS_PORT:
+        return
+    try:
+        server = ThreadingHTTPServer(("127.0.0.1", config.METRICS_PORT), _Handler)
+    except OSError as e:
+        logger.error(f"Metrics endpoint not started: {e}")
+        return
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"Metrics on http://127.0.0.1:{config.METRICS_PORT}/metrics")
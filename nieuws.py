@@ -0,0 +1,131 @@
+"""baksteenservice - nieuws.py
+RSS-koppen voor `nieuws`, in de achtergrond ververst.
+Exporteert: antwoord()     -> Optional[str]   (voorgerenderde koppen, eerste werkende feed)
+            ververs()
+            start_poller()
+
+De poller vraagt elke feed om de NIEUWS_INTERVAL seconden op met een
+conditionele GET (ETag / If-Modified-Since); ongewijzigde feeds kosten
+dus enkel een 304. Een request leest alleen het geheugen.
+
+Gewijzigde feeds worden incrementeel geparsed terwijl ze binnenkomen; na de
+eerste drie <item>s wordt de verbinding gesloten en de rest nooit gedownload.
+"""
+
+import html
+import logging
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, List, Optional
+
+import config
+import upstream
+
+
+log = logging.getLogger("baksteenservice.nieuws")
+
+
+NEWS_FEEDS = [
+    "https://www.vrt.be/vrtnws/nl.rss.articles.xml",
+    "https://www.demorgen.be/rss.xml",
+]
+
+
+class _Feed:
+    def __init__(self, url: str):
+        self.url           = url
+        self.etag          = None
+        self.last_modified = None
+        self.bericht: Optional[str] = None
+
+
+_feeds: Dict[str, _Feed] = {url: _Feed(url) for url in NEWS_FEEDS}
+_antwoord: Optional[str] = None
+_ververs_lock = threading.Lock()
+
+_AANTAL  = 3
+_CHUNK   = 4096
+
+
+
+# ── Ophalen ────────────────────────────────────────────────────────────────────
+
+
+def _lees_titels(chunks: Iterable[bytes], aantal: int = _AANTAL) -> List[str]:
+    """Titels van de eerste `aantal` <item>s; stopt met lezen zodra die binnen zijn."""
+    parser = ET.XMLPullParser(events=("end",))
+    titels: List[str] = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, elem in parser.read_events():
+            if elem.tag != "item":
+                continue
+            titels.append(elem.findtext("title", "").strip())
+            elem.clear()
+            if len(titels) >= aantal:
+                return titels
+    return titels
+
+
+def _render(titels: List[str]) -> Optional[str]:
+    if not titels:
+        return None
+    lines = []
+    for title in titels:
+        title = html.unescape(title)
+        if len(title) > 100:
+            title = title[:99] + "..."
+        lines.append(title)
+    return "\n".join(f"{i+1}. {t}" for i, t in enumerate(lines))
+
+
+def _ververs_feed(feed: _Feed) -> None:
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if feed.etag:
+        headers["If-None-Match"] = feed.etag
+    if feed.last_modified:
+        headers["If-Modified-Since"] = feed.last_modified
+    try:
+        with upstream.get(feed.url, timeout=10, headers=headers, stream=True) as r:
+            if r.status_code == 304:
+                return
+            if r.status_code != 200:
+                log.warning("RSS %s: status %d", feed.url, r.status_code)
+                return
+            bericht = _render(_lees_titels(r.iter_content(_CHUNK)))
+    except Exception as e:
+        log.warning("RSS %s failed: %s", feed.url, e)
+        return
+    if bericht:
+        feed.bericht       = bericht
+        feed.etag          = r.headers.get("ETag")
+        feed.last_modified = r.headers.get("Last-Modified")
+        log.info("RSS %s ververst", feed.url)
+
+
+def ververs() -> None:
+    """Ververst alle feeds en zet het antwoord van de eerste werkende feed klaar."""
+    global _antwoord
+    with _ververs_lock:
+        for url in NEWS_FEEDS:
+            _ververs_feed(_feeds[url])
+        _antwoord = next((_feeds[u].bericht for u in NEWS_FEEDS if _feeds[u].bericht), None)
+
+
+def antwoord() -> Optional[str]:
+    return _antwoord
+
+
+
+# ── Poller ─────────────────────────────────────────────────────────────────────
+
+
+def _poll_loop() -> None:
+    while True:
+        ververs()
+        time.sleep(config.NIEUWS_INTERVAL)
+
+
+def start_poller() -> None:
+    threading.Thread(target=_poll_loop, daemon=True, name="nieuws").start()
@@ -1,6 +1,6 @@
 """baksteenservice - normalise.py — accent-stripping normalisation."""
-import unicodedata, re
+import re
+from translit import strip_accents
 
 def normalise(s: str) -> str:
-    no_accents = "".join(c for c in unicodedata.normalize("NFD", s) if unicodedata.category(c) != "Mn")
-    return re.sub(r"\s+", " ", no_accents.lower().strip())
+    return re.sub(r"\s+", " ", strip_accents(s).lower().strip())
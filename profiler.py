@@ -0,0 +1,170 @@
+"""baksteenservice - profiler.py — on-demand sampling profiler for all threads.
+
+SIGUSR1 starts a sampler thread that every PROFIEL_INTERVAL reads the stack
+of every thread (sys._current_frames); SIGUSR2 stops it and writes
+LOG_DIR/profile-<time>.txt (per function, per thread, per intent, and the
+messages in flight with their current stage) plus a .folded file for
+flamegraph.pl. Nothing is hooked into the code paths themselves: intent
+and stage are read from the handle_message() frame in main.py, so with
+the profiler off there is no overhead at all.
+
+Samples are wall-clock: a thread waiting on I/O, a lock or sleep() counts.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import config
+
+logger = logging.getLogger("baksteenservice.profiler")
+
+# Calls made from handle_message() -> stage name (as in baksteen_stage_seconds)
+_STAGES = {"analyse": "analyse", "execute": "execute", "build_reply": "build_reply", "send": "send"}
+
+_Func = Tuple[str, int, str]   # file, first line, name
+
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+class _Profile:
+
+    def __init__(self):
+        self.started  = time.time()
+        self.samples  = 0
+        self.own:     Counter = Counter()          # _Func -> samples on top of the stack
+        self.total:   Counter = Counter()          # _Func -> samples anywhere in the stack
+        self.threads: Counter = Counter()          # thread name -> samples
+        self.intents: Dict[str, Counter] = {}      # intent -> Counter of _Func (own)
+        self.stages:  Counter = Counter()          # (intent, stage) -> samples
+        self.folded:  Counter = Counter()          # "thread;f1;f2;..." -> samples
+
+
+def _func(frame) -> _Func:
+    code = frame.f_code
+    return os.path.basename(code.co_filename), code.co_firstlineno, code.co_name
+
+
+def _message(stack: List) -> Optional[Dict]:
+    """The handle_message() frame in a stack (outermost first), as intent / stage / msg."""
+    for i, frame in enumerate(stack):
+        if frame.f_code.co_name == "handle_message" and frame.f_code.co_filename.endswith("main.py"):
+            inner = stack[i + 1].f_code.co_name if i + 1 < len(stack) else ""
+            local = frame.f_locals
+            return {"intent": local.get("intent", "unknown"),
+                    "stage":  _STAGES.get(inner, "analyse" if "intent" not in local else "handle_message"),
+                    "msg":    local.get("msg") or {}}
+    return None
+
+
+def _sample(prof: _Profile, me: int) -> None:
+    names = {t.ident: t.name for t in threading.enumerate()}
+    for ident, frame in sys._current_frames().items():
+        if ident == me:
+            continue
+        stack = []
+        while frame is not None:
+            stack.append(frame)
+            frame = frame.f_back
+        stack.reverse()
+        if not stack:
+            continue
+        funcs = [_func(f) for f in stack]
+        name  = names.get(ident, str(ident))
+        prof.own[funcs[-1]] += 1
+        prof.total.update(set(funcs))
+        prof.threads[name] += 1
+        group = name[name.find("(") + 1:-1] if name.endswith(")") else name   # "Thread-7 (handle_message)"
+        prof.folded[";".join([group] + [f"{fn} ({f}:{ln})" for f, ln, fn in funcs])] += 1
+        msg = _message(stack)
+        if msg:
+            prof.intents.setdefault(msg["intent"], Counter())[funcs[-1]] += 1
+            prof.stages[(msg["intent"], msg["stage"])] += 1
+    prof.samples += 1
+
+
+def _in_flight() -> List[str]:
+    """One line per message being handled right now: sender, intent, stage, age, location."""
+    lines, now = [], time.time()
+    for ident, frame in sys._current_frames().items():
+        stack = []
+        while frame is not None:
+            stack.append(frame)
+            frame = frame.f_back
+        stack.reverse()
+        msg = _message(stack)
+        if msg:
+            f, ln, fn = _func(stack[-1])
+            age = now - (msg["msg"].get("timestamp") or now)
+            lines.append(f"{msg['msg'].get('sender', '?'):<14} {msg['intent']:<14} {msg['stage']:<12} "
+                         f"{age:6.1f}s  {fn} ({f}:{stack[-1].f_lineno})")
+    return lines
+
+
+def _fmt(counter: Counter, samples: int, limit: int = 30) -> List[str]:
+    """Top entries with their share of all thread samples."""
+    return [f"{n:7d} {100 * n / max(samples, 1):5.1f}%  {fn} ({f}:{ln})"
+            for (f, ln, fn), n in counter.most_common(limit)]
+
+
+def _write(prof: _Profile) -> str:
+    os.makedirs(config.LOG_DIR, exist_ok=True)
+    base = os.path.join(config.LOG_DIR, "profile-" + datetime.fromtimestamp(prof.started).strftime("%Y%m%d-%H%M%S"))
+    secs = time.time() - prof.started
+    total = sum(prof.threads.values())
+    out = [f"Profile {datetime.fromtimestamp(prof.started):%Y-%m-%d %H:%M:%S}, {secs:.1f}s, "
+           f"{prof.samples} samples every {config.PROFIEL_INTERVAL}s (wall-clock, all threads)", ""]
+    out += ["── Per function (own) ──"] + _fmt(prof.own, total) + [""]
+    out += ["── Per function (incl. callees) ──"] + _fmt(prof.total, total) + [""]
+    out += ["── Per thread ──"] + [f"{n:7d} {100 * n / max(total, 1):5.1f}%  {name}"
+                                   for name, n in prof.threads.most_common()] + [""]
+    out += ["── Per intent ──"]
+    for intent, counter in sorted(prof.intents.items(), key=lambda kv: -sum(kv[1].values())):
+        stages = ", ".join(f"{s} {n}" for (i, s), n in prof.stages.most_common() if i == intent)
+        out += [f"{intent}: {sum(counter.values())} samples ({stages})"] + _fmt(counter, total, 10) + [""]
+    flight = _in_flight()
+    out += [f"── In flight ({len(flight)}) ──"] + flight
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(out) + "\n")
+    with open(base + ".folded", "w", encoding="utf-8") as f:
+        f.writelines(f"{stack} {n}\n" for stack, n in prof.folded.items())
+    return base + ".txt"
+
+
+def _run() -> None:
+    prof, me = _Profile(), threading.get_ident()
+    deadline = prof.started + config.PROFIEL_MAX_DUUR
+    while not _stop.wait(config.PROFIEL_INTERVAL):
+        _sample(prof, me)
+        if time.time() > deadline:
+            logger.warning(f"Profiling stopped after PROFIEL_MAX_DUUR ({config.PROFIEL_MAX_DUUR}s)")
+            break
+    try:
+        logger.info(f"Profile written to {_write(prof)}")
+    except OSError as e:
+        logger.error(f"Profile not written: {e}")
+
+
+def start(*_) -> None:
+    """Starts sampling (SIGUSR1); a no-op if it is already running."""
+    global _thread
+    with _lock:
+        if _thread and _thread.is_alive():
+            return
+        _stop.clear()
+        _thread = threading.Thread(target=_run, name="profiler", daemon=True)
+        _thread.start()
+    logger.info("Profiling started (SIGUSR2 stops and writes the profile)")
+
+
+def stop(*_) -> None:
+    """Stops sampling (SIGUSR2); the sampler thread writes the profile."""
+    with _lock:
+        if _thread and _thread.is_alive():
+            _stop.set()
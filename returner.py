@@ -1,83 +1,199 @@
+import itertools
 import logging
+import queue
+import re
+import threading
 import time
-import unicodedata
 
 import config
+import tracker
+from translit import to_ascii
 
 logger = logging.getLogger("baksteenservice.returner")
 
+# Final result lines of AT+CMGS; only whole lines count, never text inside an echo.
+_CMGS_RE = re.compile(r"^\+CMGS:\s*(\d+)$", re.MULTILINE)
+_CMS_RE  = re.compile(r"^\+CMS ERROR:\s*(\d+)$", re.MULTILINE)
+_FINAL_RE = re.compile(r"^(\+CMGS:\s*\d+|\+CMS ERROR:\s*\d+|ERROR)$")
+
+
+class _Outgoing:
+
+    def __init__(self, recipient: str, text: str, trace=None):
+        self.recipient = recipient
+        self.text      = text
+        self.trace     = trace
+        self.queued_at = time.time()
+        self.attempts  = 0
+
+    @property
+    def priority(self) -> int:
+        """Number of SMS parts: single-part replies go out before long ones."""
+        return 1 if len(self.text) <= 160 else -(-len(self.text) // 153)
+
+
+class SendError(Exception):
+    """
+    The modem did not confirm a send (no prompt, ERROR or +CMS ERROR).
+    retry=False when the body already went out without an answer: the SMS
+    may have been sent, so sending it again could deliver it twice.
+    """
+
+    def __init__(self, reason: str, retry: bool = True):
+        super().__init__(reason)
+        self.retry = retry
+
 
 class SMSReturner:
+    """
+    Replies are queued by send() and returned from immediately. One sender
+    thread drains the queue, shortest replies first. It takes the listener's
+    serial_lock per send and steps aside when poll_loop is waiting for it, so
+    intake keeps running during a backlog of replies. Each AT+CMGS is a small state machine (prompt -> body -> confirmation)
+    driven by blocking serial reads, and failed sends are retried.
+    """
+
+    _STOP = (float("inf"), 0, None)
 
     def __init__(self, listener=None):
         self.listener = listener
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._seq    = itertools.count(1)
+        self._thread = None
 
     def sanitize(self, text: str) -> str:
-        symbol_replacements = {
-            "°": "", "€": "EUR", "→": "->", "➡": "->",
-            "–": "-", "—": "-", "…": "...",
-            "\u2019": "'", "\u2018": "'", "\u201c": '"', "\u201d": '"',
-            "\u00b0": "", "×": "x", "÷": "/",
-            "½": "1/2", "¼": "1/4", "¾": "3/4",
-            "²": "2", "³": "3", "µ": "u",
-            "©": "(c)", "®": "(r)", "™": "(tm)",
-            "•": "-", "·": ".",
-        }
-        for char, replacement in symbol_replacements.items():
-            text = text.replace(char, replacement)
-        normalized = unicodedata.normalize("NFD", text)
-        text = "".join(c for c in normalized if unicodedata.category(c) != "Mn")
-        return text.encode("ascii", errors="ignore").decode("ascii")
+        return to_ascii(text)
 
     def build_reply(self, analysis, action_result):
         return action_result.get("message")
 
-    def send(self, recipient, text):
+    def send(self, recipient, text, trace=None):
+        tracker.queued(trace)
         if config.DEV_MODE:
             print(f"[Reply to {recipient}]")
             for line in text.splitlines():
                 print(f"  {line}")
             print(f"  ({len(text)} chars)")
         else:
-            self.sendsms(recipient, text)
+            self._enqueue(_Outgoing(recipient, self.sanitize(text), trace))
 
-    def sendsms(self, recipient, text):
-        text = self.sanitize(text)
-        ser = self.listener.ser
-        lock = self.listener.lock
+
+    # ── Sender thread ─────────────────────────────────────────────────────────
+
+    def start(self):
+        if config.DEV_MODE or self._thread:
+            return
+        self._thread = threading.Thread(target=self._sender_loop, name="sms-sender", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30):
+        """Sends what is still queued (up to `timeout` seconds), then stops the sender."""
+        if not self._thread:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        left = self._queue.qsize()
+        if left:
+            logger.warning(f"Stopped with {left} replies still queued")
+
+    def _enqueue(self, msg: _Outgoing):
+        self._queue.put((msg.priority, next(self._seq), msg))
+        logger.info(f"Reply to {msg.recipient} queued ({len(msg.text)} chars, {self._queue.qsize()} waiting)")
+
+    def _sender_loop(self):
+        while True:
+            item = self._queue.get()
+            if item[2] is None:
+                return
+            with self.listener.serial_lock:   # per send, so a poll can run in between
+                self._attempt(item[2])
+            deadline = time.time() + 5
+            while self.listener.poll_waiting.is_set() and time.time() < deadline:
+                time.sleep(0.01)              # let poll_loop take the port first
+
+    def _attempt(self, msg: _Outgoing):
+        msg.attempts += 1
+        started = time.time()
         try:
-            with lock:  # poll_loop skips while this is held
-                ser.reset_input_buffer()
-                ser.write(f'AT+CMGS="{recipient}"\r'.encode())
-
-                # Wait for '>' prompt before sending body
-                deadline = time.time() + 5
-                buf = ""
-                while time.time() < deadline:
-                    buf += ser.read(ser.in_waiting or 1).decode("utf-8", errors="ignore")
-                    if ">" in buf:
-                        break
-                    time.sleep(0.05)
-
-                if ">" not in buf:
-                    logger.warning(f"No '>' prompt received, aborting send to {recipient}.")
-                    ser.write(b"\x1b")  # ESC to cancel
-                    return
-
-                ser.write(f'{text}\x1a'.encode())
-
-                # Wait for +CMGS confirmation
-                deadline = time.time() + 10
-                resp = ""
-                while time.time() < deadline:
-                    resp += ser.read(ser.in_waiting or 1).decode("utf-8", errors="ignore")
-                    if "+CMGS" in resp or "ERROR" in resp:
-                        break
-                    time.sleep(0.2)
-
-                if "+CMGS" in resp:
-                    logger.info(f"SMS sent to {recipient}")
-                else:
-                    logger.warning(f"Modem response: {resp.strip()}")
+            ref = self.sendsms(msg.recipient, msg.text)
+        except SendError as e:
+            if not e.retry:
+                logger.error(f"SMS to {msg.recipient} not confirmed ({e}), not retried to avoid a duplicate")
+                tracker.failed(msg.trace)
+            elif msg.attempts < config.SMS_POGINGEN:
+                logger.warning(f"Send to {msg.recipient} failed ({e}), retry {msg.attempts}/"
+                               f"{config.SMS_POGINGEN - 1} in {config.SMS_HERPROBEER_NA}s")
+                timer = threading.Timer(config.SMS_HERPROBEER_NA, self._enqueue, args=(msg,))
+                timer.daemon = True
+                timer.start()
+            else:
+                logger.error(f"Giving up on SMS to {msg.recipient} after {msg.attempts} attempts: {e}")
+                tracker.failed(msg.trace)
+            return
         except Exception as e:
-            logger.error(f"Failed to send SMS: {e}")
\ No newline at end of file
+            logger.error(f"Failed to send SMS: {e}")
+            tracker.failed(msg.trace)
+            return
+        done = time.time()
+        tracker.sent(msg.trace, ref)
+        logger.info(f"SMS sent to {msg.recipient} (ref {ref}, {len(msg.text)} chars, "
+                    f"queued {started - msg.queued_at:.2f}s, modem {done - started:.2f}s, "
+                    f"attempt {msg.attempts})")
+
+
+    # ── AT+CMGS ───────────────────────────────────────────────────────────────
+
+    def sendsms(self, recipient, text) -> int:
+        """
+        Sends one SMS; the caller holds listener.serial_lock. Returns the message
+        reference from +CMGS, raises SendError otherwise.
+        """
+        ser = self.listener.ser
+        ser.reset_input_buffer()
+        ser.write(f'AT+CMGS="{recipient}"\r'.encode())
+
+        resp = self._read_until(ser, config.SMS_PROMPT_TIMEOUT, prompt=True)
+        if ">" not in resp:
+            ser.write(b"\x1b")  # ESC to cancel
+            raise self._error(resp, "no '>' prompt")
+
+        ser.write(f'{text}\x1a'.encode())
+
+        resp = self._read_until(ser, config.SMS_CMGS_TIMEOUT, echo=text)
+        m = _CMGS_RE.search(resp)
+        if m:
+            return int(m.group(1))
+        if _CMS_RE.search(resp) or re.search(r"^ERROR$", resp, re.MULTILINE):
+            raise self._error(resp, "ERROR")
+        raise SendError(f"no +CMGS within {config.SMS_CMGS_TIMEOUT}s: {resp.strip()!r}", retry=False)
+
+    @staticmethod
+    def _read_until(ser, timeout: float, prompt: bool = False, echo: str = "") -> str:
+        """
+        Reads until a whole +CMGS: / +CMS ERROR: / ERROR line is in, or with
+        prompt=True also until the '>' prompt, and returns only the result
+        lines. Lines of `echo` (the body, should the modem still echo) are
+        dropped. Serial reads block up to the port timeout.
+        """
+        deadline = time.time() + timeout
+        skip = {l.strip(" \r\x1a") for l in echo.splitlines()}
+        buf = ""
+        while time.time() < deadline:
+            buf += ser.read(ser.in_waiting or 1).decode("utf-8", errors="ignore")
+            if prompt and ">" in buf:
+                return buf
+            lines = [l.strip(" \r\x1a") for l in buf.split("\n")[:-1]]   # complete lines only
+            result = [l for l in lines if l not in skip]
+            if any(_FINAL_RE.match(l) for l in result):
+                return "\n".join(result)
+        return "\n".join(l for l in (l.strip(" \r\x1a") for l in buf.split("\n")) if l not in skip)
+
+    @staticmethod
+    def _error(resp: str, fallback: str) -> SendError:
+        m = _CMS_RE.search(resp)
+        if m:
+            return SendError(f"+CMS ERROR {m.group(1)}")
+        if "ERROR" in resp:
+            return SendError("ERROR")
+        return SendError(f"{fallback}: {resp.strip()!r}" if resp.strip() else fallback)
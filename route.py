@@ -14,6 +14,7 @@ from typing import Optional
 
 
 import secrets as _secrets
+import upstream
 
 
 log = logging.getLogger("baksteenservice.route")
@@ -40,7 +41,7 @@ _PLATFORM_IN_NAME_RE = re.compile(
 
 def _api_get(url: str, params: dict) -> Optional[dict]:
     try:
-        r = requests.get(url, params=params, timeout=10)
+        r = upstream.get(url, params=params, timeout=10)
         r.raise_for_status()
         data   = r.json()
         status = data.get("status", "")
@@ -130,7 +131,7 @@ def _irail_platforms(dep_station: str, arr_station: str, dep_unix: int) -> tuple
     log.info("  iRail lookup: '%s' -> '%s' om %s", dep_clean, arr_clean, dep_dt.strftime("%H:%M"))
 
     try:
-        resp = requests.get(
+        resp = upstream.get(
             f"{_IRAIL}/connections/",
             headers={"User-Agent": _IRAIL_UA},
             params={
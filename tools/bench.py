@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""baksteenservice - tools/bench.py
+End-to-end benchmark: replays an SMS corpus through SMSAnalyser -> ActionHandler
+-> SMSReturner against recorded upstream responses, and reports throughput and
+latency percentiles per intent.
+
+    python tools/bench.py --concurrency 4 --rounds 3 --latency 0.15
+
+Everything runs in-process on ephemeral ports: tools/replay_server.py serves
+tools/fixtures (with the injected latency), tools/llm_stub.py answers gpt /
+vertaling, and a simulated modem confirms each AT+CMGS after --modem-latency.
+Caches (data/) live in a temporary directory, so round 1 runs with cold caches
+and later rounds show the warm path.
+
+Per message two latencies are measured: "handled" (analyse until the reply is
+queued) and "sent" (until the modem confirmed it with +CMGS).
+"""
+import argparse
+import itertools
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+TOOLS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS, ".."))
+sys.path.insert(1, TOOLS)
+
+import config          # noqa: E402
+import llm_stub        # noqa: E402
+import replay_server   # noqa: E402
+import secrets as _secrets  # noqa: E402  (the repo's secrets.py)
+
+logger = logging.getLogger("baksteenservice.bench")
+
+
+# ── Simulated modem ────────────────────────────────────────────────────────────
+
+
+class _Serial:
+    """Answers AT+CMGS with '>' and the body with +CMGS: <ref> after `latency` seconds."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.out     = b""
+        self.refs    = itertools.count(1)
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.out)
+
+    def reset_input_buffer(self):
+        self.out = b""
+
+    def write(self, data: bytes):
+        if data.startswith(b"AT+CMGS"):
+            self.out += b"\r\n> "
+        elif data.endswith(b"\x1a"):
+            time.sleep(self.latency)
+            self.out += b"\r\n+CMGS: %d\r\n\r\nOK\r\n" % (next(self.refs) % 256)
+
+    def read(self, n: int) -> bytes:
+        if not self.out:
+            time.sleep(0.001)
+            return b""
+        data, self.out = self.out[:n], self.out[n:]
+        return data
+
+
+class _Modem:
+    def __init__(self, latency: float):
+        self.serial_lock  = threading.Lock()
+        self.poll_waiting = threading.Event()
+        self.ser          = _Serial(latency)
+
+
+
+# ── Setup ──────────────────────────────────────────────────────────────────────
+
+
+def _start_llm_stub(opts) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), llm_stub.Handler)
+    server.daemon_threads = True
+    server.opts  = SimpleNamespace(latency=opts.llm_latency, jitter=opts.jitter,
+                                   tokens_per_sec=opts.tokens_per_sec)
+    server.stats = llm_stub.Stats()
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server
+
+
+def _configure(opts):
+    """Points config at the local servers; must run before the service modules are imported."""
+    replay = replay_server.start(SimpleNamespace(
+        host="127.0.0.1", port=0, latency=opts.latency, jitter=opts.jitter,
+        host_latency=opts.host_latency, record=False))
+    stub = _start_llm_stub(opts)
+    config.DEV_MODE        = False
+    config.DATA_DIR        = tempfile.mkdtemp(prefix="baksteen-bench-")
+    config.UPSTREAM_REPLAY = f"http://127.0.0.1:{replay.server_address[1]}"
+    config.LLM_BASE_URL    = f"http://127.0.0.1:{stub.server_address[1]}/v1"
+    config.METRICS_PORT    = None
+    config.API_DAGQUOTA    = {}
+    _secrets.DEEPSEEK_API_KEY = _secrets.DEEPSEEK_API_KEY or "bench"   # the stub ignores it
+    return replay, stub
+
+
+def _load_corpus(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [l.strip() for l in f if l.strip() and not l.startswith("#")]
+
+
+
+# ── Run ────────────────────────────────────────────────────────────────────────
+
+
+def _pct(values, q: float) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--corpus", default=os.path.join(TOOLS, "bench_corpus.txt"))
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--concurrency", type=int, default=4, help="messages handled at the same time")
+    ap.add_argument("--latency", type=float, default=0.15, help="injected upstream latency (s)")
+    ap.add_argument("--jitter", type=float, default=0.05)
+    ap.add_argument("--host-latency", action="append", default=[], metavar="HOST=SEC")
+    ap.add_argument("--llm-latency", type=float, default=0.4, help="LLM time to first token (s)")
+    ap.add_argument("--tokens-per-sec", type=float, default=40.0)
+    ap.add_argument("--modem-latency", type=float, default=2.0, help="AT+CMGS to +CMGS (s)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("-v", "--verbose", action="store_true")
+    opts = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO if opts.verbose else logging.WARNING,
+                        format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+    random.seed(opts.seed)
+    replay, stub = _configure(opts)
+
+    import tracker
+    from action import ActionHandler
+    from analyser import SMSAnalyser
+    from returner import SMSReturner
+
+    analyser = SMSAnalyser()
+    handler  = ActionHandler()
+    returner = SMSReturner(listener=_Modem(opts.modem_latency))
+    returner.start()
+
+    corpus = _load_corpus(opts.corpus)
+    handled = defaultdict(list)
+    sent    = defaultdict(list)
+    failed  = defaultdict(int)
+    lock    = threading.Lock()
+
+    def one(i: int, text: str):
+        msg = {"sender": f"+32470{i:06d}", "text": text, "timestamp": time.time()}
+        t0 = time.perf_counter()
+        trace = tracker.start(msg)
+        analysis = analyser.analyse(msg)
+        intent = trace.intent = analysis["intent"]
+        result = handler.execute(analysis)
+        returner.send(msg["sender"], returner.build_reply(analysis, result), trace=trace)
+        t1 = time.perf_counter()
+        while "sent" not in trace.times and time.perf_counter() - t1 < 60:
+            time.sleep(0.002)
+        t2 = time.perf_counter()
+        with lock:
+            handled[intent].append(t1 - t0)
+            sent[intent].append(t2 - t0)
+            if not result.get("success"):
+                failed[intent] += 1
+
+    print(f"{len(corpus)} messages x {opts.rounds} rounds, concurrency {opts.concurrency}, "
+          f"upstream {opts.latency}s, LLM {opts.llm_latency}s + {opts.tokens_per_sec:g} tok/s, "
+          f"modem {opts.modem_latency}s\n")
+    seq = itertools.count()
+    total_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=opts.concurrency) as pool:
+        for r in range(1, opts.rounds + 1):
+            batch = corpus[:]
+            random.shuffle(batch)
+            t = time.perf_counter()
+            list(pool.map(lambda text: one(next(seq), text), batch))
+            dt = time.perf_counter() - t
+            print(f"round {r}: {len(batch) / dt:6.2f} msg/s ({dt:.1f}s)" + ("  [cold caches]" if r == 1 else ""))
+    elapsed = time.perf_counter() - total_start
+    returner.stop()
+
+    n = sum(len(v) for v in handled.values())
+    print(f"\ntotal: {n} messages in {elapsed:.1f}s = {n / elapsed:.2f} msg/s\n")
+
+    def fmt(v):
+        return "/".join(f"{_pct(v, q):.3f}" for q in (50, 95, 99))
+
+    print(f"{'intent':<16}{'n':>5}{'fail':>6}   {'handled p50/p95/p99 (s)':<27}{'sent p50/p95/p99 (s)'}")
+    for intent in sorted(handled):
+        h, s = handled[intent], sent[intent]
+        print(f"{intent:<16}{len(h):>5}{failed[intent]:>6}   {fmt(h):<27}{fmt(s)}")
+    all_h = [v for vs in handled.values() for v in vs]
+    all_s = [v for vs in sent.values() for v in vs]
+    print(f"{'(all)':<16}{n:>5}{sum(failed.values()):>6}   {fmt(all_h):<27}{fmt(all_s)}")
+    print(f"\nupstream: {replay.summary()}")
+    print(f"llm stub: {stub.stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
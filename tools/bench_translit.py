@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""baksteenservice - tools/bench_translit.py
+Benchmarks translit.to_ascii / strip_accents / normalise against the previous
+per-call implementations, and checks that both give identical output.
+
+    python tools/bench_translit.py [--corpus replies.txt] [--rounds 2000]
+
+The corpus file holds one reply per paragraph (blank-line separated), e.g. replies
+copied from the logs; without one, a built-in sample of typical replies is used.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from normalise import normalise          # noqa: E402
+from translit import strip_accents, to_ascii  # noqa: E402
+
+SAMPLE = [
+    "07:42 Leuven spoor 3 -> 08:01 Brussel-Centraal spoor 5\n07:55 Leuven spoor 1 -> 08:14 Brussel-Centraal spoor 2",
+    "Leuven\nVandaag min: 4C max: 11C\n14:00 9C Half bewolkt, wind: 14km/h, regen: 20%\n15:00 10C Lichte regen, wind: 16km/h, regen: 60%",
+    "Liège\nAuj. min: 3C max: 9C\n14:00 8C Pluie modérée, vent: 18km/h, pluie: 80%\n15:00 8C Dégagé, vent: 12km/h, pluie: 0%",
+    "1. Regering bereikt akkoord over begroting – oppositie reageert\n2. Rode Duivels winnen met 2–0\n3. Files op de E40 richting Brussel",
+    "Madrid is de hoofdstad van Spanje. De stad ligt centraal op het Iberisch schiereiland en telt ongeveer 3,3 miljoen inwoners.",
+    "Een croissant kost ongeveer €1,20 – in Parijs eerder €1,50… “Goedkoop” is relatief.",
+    "fiets -> bicycle",
+    "Apotheek Pauwels\nBondgenotenlaan 12, 3000 Leuven\n016123456\n---\nApotheek Dewinter\nTiensestraat 8, 3000 Leuven\n016654321",
+    "08:12 Leuven Station sp.3 trein (4 haltes) -> Tienen sp.1 08:27\n~350m te voet\n(21min)",
+    "Gare de Bruxelles-Midi → Grand-Place: ½ heure à pied, ±2 km",
+]
+
+# ── Previous implementations (returner.py / listener.py / normalise.py) ──────
+
+
+def old_sanitize(text: str) -> str:
+    symbol_replacements = {
+        "°": "", "€": "EUR", "→": "->", "➡": "->",
+        "–": "-", "—": "-", "…": "...",
+        "’": "'", "‘": "'", "“": '"', "”": '"',
+        "°": "", "×": "x", "÷": "/",
+        "½": "1/2", "¼": "1/4", "¾": "3/4",
+        "²": "2", "³": "3", "µ": "u",
+        "©": "(c)", "®": "(r)", "™": "(tm)",
+        "•": "-", "·": ".",
+    }
+    for char, replacement in symbol_replacements.items():
+        text = text.replace(char, replacement)
+    normalized = unicodedata.normalize("NFD", text)
+    text = "".join(c for c in normalized if unicodedata.category(c) != "Mn")
+    return text.encode("ascii", errors="ignore").decode("ascii")
+
+
+def old_strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+
+def old_normalise(s: str) -> str:
+    no_accents = "".join(c for c in unicodedata.normalize("NFD", s) if unicodedata.category(c) != "Mn")
+    return re.sub(r"\s+", " ", no_accents.lower().strip())
+
+
+def _bench(fn, corpus, rounds) -> float:
+    t = time.perf_counter()
+    for _ in range(rounds):
+        for text in corpus:
+            fn(text)
+    return (time.perf_counter() - t) / (rounds * len(corpus)) * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus")
+    ap.add_argument("--rounds", type=int, default=2000)
+    opts = ap.parse_args()
+
+    corpus = SAMPLE
+    if opts.corpus:
+        with open(opts.corpus, encoding="utf-8") as f:
+            corpus = [p.strip() for p in f.read().split("\n\n") if p.strip()]
+    ascii_share = sum(t.isascii() for t in corpus) / len(corpus)
+    print(f"{len(corpus)} replies, {ascii_share:.0%} already plain ASCII, {opts.rounds} rounds\n")
+
+    pairs = [("sanitize", old_sanitize, to_ascii),
+             ("strip_accents", old_strip_accents, strip_accents),
+             ("normalise", old_normalise, normalise)]
+    print(f"{'function':<15}{'old us/call':>12}{'new us/call':>12}{'speedup':>9}  identical")
+    for name, old, new in pairs:
+        same = all(old(t) == new(t) for t in corpus)
+        t_old = _bench(old, corpus, opts.rounds)
+        t_new = _bench(new, corpus, opts.rounds)
+        print(f"{name:<15}{t_old:>12.2f}{t_new:>12.2f}{t_old / t_new:>8.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
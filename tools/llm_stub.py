@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""baksteenservice - tools/llm_stub.py
+Local OpenAI-compatible chat-completions server for load-testing gpt/vertaling offline.
+
+    python tools/llm_stub.py --port 8089 --latency 0.4 --tokens-per-sec 40
+
+then set config.LLM_BASE_URL = "http://127.0.0.1:8089/v1". Both stream=True
+(server-sent events) and stream=False are supported; max_tokens is honoured and
+clients that close a stream early are counted as cancelled. Batched translation
+prompts (a JSON array as user message) get a JSON array back.
+"""
+import argparse
+import json
+import logging
+import random
+import signal
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("baksteenservice.llm_stub")
+
+DEFAULT_REPLY = (
+    "Madrid is de hoofdstad van Spanje. De stad ligt centraal op het Iberisch "
+    "schiereiland en telt ongeveer drie miljoen inwoners. Ze staat bekend om het "
+    "Prado, het Koninklijk Paleis en het Retiro-park. Madrid is ook het politieke "
+    "en economische centrum van het land, met een uitgebreid metronet."
+)
+
+
+class Stats:
+    def __init__(self):
+        self.lock      = threading.Lock()
+        self.requests  = 0
+        self.streamed  = 0
+        self.cancelled = 0
+        self.tokens    = 0
+
+    def add(self, **kw):
+        with self.lock:
+            for k, v in kw.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    def summary(self) -> str:
+        return (f"requests={self.requests} streamed={self.streamed} "
+                f"cancelled={self.cancelled} tokens={self.tokens}")
+
+
+def _tokens(text: str):
+    """Rough tokenisation: words with their trailing space."""
+    words = text.split(" ")
+    return [w + " " for w in words[:-1]] + [words[-1]]
+
+
+def _reply_for(messages) -> str:
+    user = messages[-1].get("content", "") if messages else ""
+    try:
+        items = json.loads(user)
+        if isinstance(items, list):
+            return json.dumps([f"[stub] {i}" for i in items], ensure_ascii=False)
+    except ValueError:
+        pass
+    return DEFAULT_REPLY
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "llm-stub/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt, *args)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body  = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        opts  = self.server.opts
+        reply = _reply_for(body.get("messages", []))
+        toks  = _tokens(reply)
+        limit = body.get("max_tokens")
+        finish = "stop"
+        if limit and len(toks) > limit:
+            toks, finish = toks[:limit], "length"
+        self.server.stats.add(requests=1)
+
+        time.sleep(max(0.0, random.gauss(opts.latency, opts.jitter)))
+        meta = {"id": "chatcmpl-" + uuid.uuid4().hex[:12], "created": int(time.time()),
+                "model": body.get("model", "stub")}
+        if body.get("stream"):
+            self._stream(meta, toks, finish)
+        else:
+            time.sleep(len(toks) / opts.tokens_per_sec)
+            self.server.stats.add(tokens=len(toks))
+            self._json({**meta, "object": "chat.completion", "choices": [{
+                "index": 0, "finish_reason": finish,
+                "message": {"role": "assistant", "content": "".join(toks)}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(toks),
+                          "total_tokens": len(toks)}})
+
+    def _json(self, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, meta, toks, finish):
+        self.server.stats.add(streamed=1)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, reason=None):
+            chunk = {**meta, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": reason}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        sent = 0
+        try:
+            event({"role": "assistant", "content": ""})
+            for tok in toks:
+                time.sleep(1.0 / self.server.opts.tokens_per_sec)
+                event({"content": tok})
+                sent += 1
+            event({}, finish)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.stats.add(cancelled=1)
+            logger.info(f"Stream cancelled by client after {sent}/{len(toks)} tokens")
+        finally:
+            self.server.stats.add(tokens=sent)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--latency", type=float, default=0.4, help="seconds to first token")
+    ap.add_argument("--jitter", type=float, default=0.1, help="stddev of the latency")
+    ap.add_argument("--tokens-per-sec", type=float, default=40.0)
+    opts = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+    server = ThreadingHTTPServer((opts.host, opts.port), Handler)
+    server.daemon_threads = True
+    server.opts  = opts
+    server.stats = Stats()
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    logger.info(f"LLM stub on http://{opts.host}:{opts.port}/v1 "
+                f"(latency {opts.latency}s, {opts.tokens_per_sec} tok/s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info(server.stats.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""baksteenservice - tools/modem_sim.py
+SIM800C emulator on a pseudo-terminal, for running listener.py / returner.py without hardware.
+
+    python tools/modem_sim.py --link /tmp/sim800 --burst 10 --interval 30
+
+then set config.MODEM_PORT = "/tmp/sim800" and DEV_MODE = False and start main.py.
+
+Text-mode commands: AT, ATE0/ATE1, AT+CMGF, AT+CNMI, AT+CSMP, AT+CMGL, AT+CMGR,
+AT+CMGD, AT+CMGDA, AT+CMGS (prompt, body, Ctrl-Z / ESC); anything else answers OK.
+Incoming SMS are injected in bursts of --burst every --interval seconds (texts
+from tools/bench_corpus.txt) into SIM storage of --capacity slots, announced
+with +CMTI when CNMI asks for it. Sent messages are confirmed with +CMGS after
+--send-latency; with the status-report bit set in AT+CSMP a report follows
+after --delivery-latency (stored, +CDSI, or +CDS, per the CNMI ds setting).
+Output is paced at --baud, and --fail-rate answers a share of sends with
++CMS ERROR: 500.
+
+Every --stats seconds, and on exit, it prints intake (injection -> AT+CMGD)
+latency percentiles, sends per second and the storage high-water mark. SMS
+that AT+CMGDA deletes before the listener read them count as "wiped".
+"""
+import argparse
+import os
+import pty
+import random
+import signal
+import statistics
+import sys
+import threading
+import time
+import tty
+from datetime import datetime
+from typing import Dict, List, Optional
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_corpus.txt")
+
+
+class _Slot:
+    def __init__(self, kind: str, **fields):
+        self.kind     = kind          # "sms" or "report"
+        self.read     = False
+        self.stored   = time.time()
+        self.__dict__.update(fields)
+
+
+def _ts(t: float) -> str:
+    return datetime.fromtimestamp(t).strftime("%y/%m/%d,%H:%M:%S") + "+08"
+
+
+class Sim800:
+
+    def __init__(self, opts, fd: int):
+        self.opts   = opts
+        self.fd     = fd
+        self.echo   = not opts.no_echo
+        self.cnmi   = [0, 0, 0, 0, 0]
+        self.fo     = 17              # CSMP first octet; 0x20 = status report requested
+        self.slots: Dict[int, _Slot] = {}
+        self.mr     = 0
+        self.lock   = threading.Lock()     # storage + counters
+        self.wlock  = threading.Lock()     # serial output
+        self.corpus = self._load_corpus()
+        # statistics
+        self.injected = self.dropped = self.wiped = self.sent = self.failed = self.reports = 0
+        self.intake: List[float] = []
+        self.high_water = 0
+        self.first_send: Optional[float] = None
+
+    @staticmethod
+    def _load_corpus() -> List[str]:
+        try:
+            with open(CORPUS, encoding="utf-8") as f:
+                return [l.strip() for l in f if l.strip() and not l.startswith("#")]
+        except OSError:
+            return ["weer leuven", "nieuws", "trein gent brussel"]
+
+    # ── Output ────────────────────────────────────────────────────────────────
+
+    def write(self, text: str) -> None:
+        data = text.encode("ascii", errors="replace")
+        with self.wlock:
+            for i in range(0, len(data), 64):
+                chunk = data[i:i + 64]
+                os.write(self.fd, chunk)
+                time.sleep(len(chunk) * 10 / self.opts.baud)   # 8N1: 10 bits per byte
+
+    def urc(self, line: str) -> None:
+        """Unsolicited result code."""
+        self.write(f"\r\n{line}\r\n")
+
+    # ── Storage ───────────────────────────────────────────────────────────────
+
+    def _store(self, slot: _Slot) -> Optional[int]:
+        with self.lock:
+            free = next((i for i in range(1, self.opts.capacity + 1) if i not in self.slots), None)
+            if free is None:
+                self.dropped += 1
+                return None
+            self.slots[free] = slot
+            self.high_water = max(self.high_water, len(self.slots))
+            return free
+
+    def inject(self, sender: str, text: str) -> None:
+        idx = self._store(_Slot("sms", sender=sender, text=text, scts=time.time()))
+        with self.lock:
+            self.injected += 1
+        if idx is None:
+            self.urc("+CMS ERROR: 322")   # memory full
+        elif self.cnmi[0] > 0 and self.cnmi[1] == 1:
+            self.urc(f'+CMTI: "SM",{idx}')
+
+    def _status_report(self, mr: int, number: str, submitted: float) -> None:
+        ok = random.random() >= self.opts.fail_rate
+        fields = dict(fo=6, mr=mr, number=number, scts=submitted, dt=time.time(), st=0 if ok else 70)
+        with self.lock:
+            self.reports += 1
+        ds = self.cnmi[3]
+        if ds == 1:
+            self.urc(f'+CDS: 6,{mr},"{number}",145,"{_ts(submitted)}","{_ts(time.time())}",{fields["st"]}')
+        elif ds == 2:
+            idx = self._store(_Slot("report", **fields))
+            if idx is not None and self.cnmi[0] > 0:
+                self.urc(f'+CDSI: "SM",{idx}')
+
+    def _entry(self, idx: int, slot: _Slot, cmd: str) -> str:
+        stat = "REC READ" if slot.read else "REC UNREAD"
+        head = f'+{cmd}: {idx},' if cmd == "CMGL" else f'+{cmd}: '
+        if slot.kind == "report":
+            return (f'{head}"{stat}",{slot.fo},{slot.mr},"{slot.number}",145,'
+                    f'"{_ts(slot.scts)}","{_ts(slot.dt)}",{slot.st}\r\n')
+        return f'{head}"{stat}","{slot.sender}","","{_ts(slot.scts)}"\r\n{slot.text}\r\n'
+
+    # ── Commands ──────────────────────────────────────────────────────────────
+
+    def command(self, line: str) -> None:
+        time.sleep(max(0.0, random.gauss(self.opts.cmd_latency, self.opts.cmd_latency / 4)))
+        up = line.upper()
+        if up in ("ATE0", "ATE1"):
+            self.echo = up == "ATE1"
+            self.write("\r\nOK\r\n")
+        elif up.startswith("AT+CNMI="):
+            parts = [int(p) if p.strip().isdigit() else 0 for p in line[8:].split(",")]
+            self.cnmi = (parts + [0] * 5)[:5]
+            self.write("\r\nOK\r\n")
+        elif up.startswith("AT+CSMP="):
+            first = line[8:].split(",")[0].strip()
+            self.fo = int(first) if first.isdigit() else self.fo
+            self.write("\r\nOK\r\n")
+        elif up.startswith("AT+CMGL"):
+            want = line.split("=", 1)[1].strip('"').upper() if "=" in line else "REC UNREAD"
+            out = []
+            with self.lock:
+                for idx in sorted(self.slots):
+                    slot = self.slots[idx]
+                    if want == "ALL" or (want == "REC UNREAD") != slot.read:
+                        out.append(self._entry(idx, slot, "CMGL"))
+                        slot.read = True
+            self.write("\r\n" + "".join(out) + "\r\nOK\r\n")
+        elif up.startswith("AT+CMGR="):
+            idx = int(line[8:] or 0)
+            with self.lock:
+                slot = self.slots.get(idx)
+                entry = self._entry(idx, slot, "CMGR") if slot else ""
+                if slot:
+                    slot.read = True
+            self.write(f"\r\n{entry}\r\nOK\r\n" if slot else "\r\n+CMS ERROR: 321\r\n")
+        elif up.startswith("AT+CMGDA"):
+            with self.lock:
+                self.wiped += sum(1 for s in self.slots.values() if s.kind == "sms")
+                self.slots.clear()
+            self.write("\r\nOK\r\n")
+        elif up.startswith("AT+CMGD="):
+            idx = int(line[8:].split(",")[0] or 0)
+            with self.lock:
+                slot = self.slots.pop(idx, None)
+                if slot is not None and slot.kind == "sms":
+                    self.intake.append(time.time() - slot.stored)
+            self.write("\r\nOK\r\n")
+        else:   # AT, AT+CMGF=1, ...
+            self.write("\r\nOK\r\n")
+
+    def submit(self, number: str, body: str) -> None:
+        """Body after AT+CMGS: network submit, then +CMGS or +CMS ERROR."""
+        time.sleep(max(0.2, random.gauss(self.opts.send_latency, self.opts.send_latency / 4)))
+        if random.random() < self.opts.fail_rate:
+            with self.lock:
+                self.failed += 1
+            self.write("\r\n+CMS ERROR: 500\r\n")
+            return
+        with self.lock:
+            self.mr = (self.mr + 1) % 256
+            mr = self.mr
+            self.sent += 1
+            self.first_send = self.first_send or time.time()
+        self.write(f"\r\n+CMGS: {mr}\r\n\r\nOK\r\n")
+        if self.fo & 0x20:
+            submitted = time.time()
+            delay = max(0.5, random.gauss(self.opts.delivery_latency, self.opts.delivery_latency / 3))
+            t = threading.Timer(delay, self._status_report, args=(mr, number, submitted))
+            t.daemon = True
+            t.start()
+
+    def serve(self) -> None:
+        """Reads the serial side: command lines, or an SMS body after AT+CMGS."""
+        buf, number = b"", None
+        while True:
+            try:
+                data = os.read(self.fd, 1024)
+            except OSError:
+                return
+            if self.echo:
+                os.write(self.fd, data)
+            buf += data
+            while buf:
+                if number is not None:
+                    end = min((i for i in (buf.find(b"\x1a"), buf.find(b"\x1b")) if i >= 0), default=-1)
+                    if end < 0:
+                        break
+                    body, ctrl, buf = buf[:end], buf[end:end + 1], buf[end + 1:]
+                    if ctrl == b"\x1a":
+                        self.submit(number, body.decode("ascii", errors="replace"))
+                    else:
+                        self.write("\r\nOK\r\n")   # ESC: cancelled
+                    number = None
+                    continue
+                if b"\r" not in buf:
+                    break
+                line, buf = buf.split(b"\r", 1)
+                line = line.strip(b"\n\x1b ").decode("ascii", errors="replace")
+                if not line:
+                    continue
+                if line.upper().startswith("AT+CMGS="):
+                    number = line.split("=", 1)[1].strip('"')
+                    time.sleep(self.opts.cmd_latency)
+                    self.write("\r\n> ")
+                else:
+                    self.command(line)
+
+    # ── Load ──────────────────────────────────────────────────────────────────
+
+    def bursts(self) -> None:
+        n = 0
+        time.sleep(self.opts.start_delay)
+        while True:
+            for _ in range(self.opts.burst):
+                n += 1
+                self.inject(f"+3247{n % 1000000:07d}", random.choice(self.corpus))
+                time.sleep(self.opts.spacing)
+            if self.opts.interval <= 0:
+                return
+            time.sleep(self.opts.interval)
+
+    def summary(self) -> str:
+        with self.lock:
+            intake = sorted(self.intake)
+            line = (f"injected {self.injected} (dropped {self.dropped}, wiped {self.wiped}), consumed {len(intake)}, "
+                    f"in storage {len(self.slots)} (max {self.high_water}/{self.opts.capacity}); "
+                    f"sent {self.sent}, failed {self.failed}, reports {self.reports}")
+            if len(intake) >= 2:
+                q = statistics.quantiles(intake, n=100, method="inclusive")
+                line += f"; intake p50 {q[49]:.2f}s p95 {q[94]:.2f}s max {intake[-1]:.2f}s"
+            if self.first_send and self.sent > 1:
+                line += f"; {self.sent / (time.time() - self.first_send):.2f} sends/s"
+            return line
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--link", help="symlink to the pty slave, e.g. /tmp/sim800")
+    ap.add_argument("--baud", type=int, default=9600)
+    ap.add_argument("--no-echo", action="store_true", help="start with ATE0 (SIM800 echoes by default)")
+    ap.add_argument("--capacity", type=int, default=30, help="SIM storage slots")
+    ap.add_argument("--burst", type=int, default=5, help="incoming SMS per burst")
+    ap.add_argument("--interval", type=float, default=30, help="seconds between bursts (0 = one burst)")
+    ap.add_argument("--spacing", type=float, default=0.05, help="seconds between SMS in a burst")
+    ap.add_argument("--start-delay", type=float, default=5)
+    ap.add_argument("--cmd-latency", type=float, default=0.03)
+    ap.add_argument("--send-latency", type=float, default=3.0, help="AT+CMGS body -> +CMGS (s)")
+    ap.add_argument("--delivery-latency", type=float, default=6.0, help="+CMGS -> status report (s)")
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    ap.add_argument("--stats", type=float, default=30, help="seconds between stat lines")
+    opts = ap.parse_args()
+
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    path = os.ttyname(slave)
+    if opts.link:
+        if os.path.islink(opts.link):
+            os.remove(opts.link)
+        os.symlink(path, opts.link)
+    print(f"SIM800C emulator on {path}" + (f" ({opts.link})" if opts.link else ""), flush=True)
+
+    sim = Sim800(opts, master)
+    threading.Thread(target=sim.serve, daemon=True, name="serial").start()
+    threading.Thread(target=sim.bursts, daemon=True, name="bursts").start()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        while not stop.wait(opts.stats):
+            print(sim.summary(), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(sim.summary(), flush=True)
+        if opts.link and os.path.islink(opts.link):
+            os.remove(opts.link)
+        os.close(slave)   # kept open until now so the master never sees EOF between clients
+
+
+if __name__ == "__main__":
+    sys.exit(main())
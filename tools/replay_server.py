@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""baksteenservice - tools/replay_server.py
+Serves recorded upstream responses (tools/fixtures/*.json) for benchmarks and offline runs.
+
+    python tools/replay_server.py --port 8090 --latency 0.15 --jitter 0.05
+    python tools/replay_server.py --record      # proxy to the real hosts, save what comes back
+
+then set config.UPSTREAM_REPLAY = "http://127.0.0.1:8090": upstream.get() sends
+https://<host><path>?<query> as /<host><path>?<query>. A fixture matches on
+host + path (the query is ignored), so one recorded answer per endpoint.
+--host-latency overrides the injected latency per host, e.g.
+--host-latency maps.googleapis.com=0.25 --host-latency api.irail.be=0.4
+
+Fixture format: {"host", "path", "status", "headers", "body"}; body is JSON
+for JSON APIs and a string for HTML/XML.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+logger = logging.getLogger("baksteenservice.replay")
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Never written to a fixture: they identify us, not the response.
+_DROP_HEADERS = {"set-cookie", "date", "server", "transfer-encoding", "connection",
+                 "content-encoding", "content-length", "alt-svc", "report-to", "nel"}
+
+
+def fixture_name(host: str, path: str) -> str:
+    return re.sub(r"[^A-Za-z0-9.]+", "_", f"{host}{path}").strip("_") + ".json"
+
+
+def load_fixtures(directory: str = FIXTURES_DIR) -> Dict[Tuple[str, str], dict]:
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            fx = json.load(f)
+        fixtures[(fx["host"], fx["path"])] = fx
+    return fixtures
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "replay/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt, *args)
+
+    def do_GET(self):
+        host, _, rest = self.path.lstrip("/").partition("/")
+        path = "/" + rest.split("?", 1)[0]
+        srv  = self.server
+        if srv.opts.record:
+            fx = self._record(host, "/" + rest)
+        else:
+            fx = srv.fixtures.get((host, path))
+        srv.count(host, fx is not None)
+        if fx is None:
+            logger.warning(f"No fixture for {host}{path}")
+            self.send_error(404, f"no fixture for {host}{path}")
+            return
+
+        if not srv.opts.record:
+            latency = srv.host_latency.get(host, srv.opts.latency)
+            time.sleep(max(0.0, random.gauss(latency, srv.opts.jitter)))
+
+        body = fx["body"]
+        data = (body if isinstance(body, str) else json.dumps(body)).encode("utf-8")
+        self.send_response(fx.get("status", 200))
+        headers = {"Content-Type": "application/json" if not isinstance(body, str) else "text/plain"}
+        headers.update(fx.get("headers", {}))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _record(self, host: str, path_query: str) -> dict:
+        """Fetches https://host/path?query for real and saves it as the fixture."""
+        req = urllib.request.Request(f"https://{host}{path_query}",
+                                     headers={"User-Agent": self.headers.get("User-Agent", "Mozilla/5.0")})
+        try:
+            with urllib.request.urlopen(req, timeout=20) as r:
+                status, headers, raw = r.status, r.headers, r.read()
+        except urllib.error.HTTPError as e:
+            status, headers, raw = e.code, e.headers, e.read()
+        text = raw.decode(headers.get_content_charset() or "utf-8", errors="replace")
+        try:
+            body = json.loads(text)
+        except ValueError:
+            body = text
+        path = path_query.split("?", 1)[0]
+        fx = {"host": host, "path": path, "status": status,
+              "headers": {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS},
+              "body": body}
+        os.makedirs(FIXTURES_DIR, exist_ok=True)
+        with open(os.path.join(FIXTURES_DIR, fixture_name(host, path)), "w", encoding="utf-8") as f:
+            json.dump(fx, f, ensure_ascii=False, indent=1)
+        logger.info(f"Recorded {host}{path} ({status}, {len(raw)} bytes)")
+        return fx
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, opts):
+        super().__init__(addr, Handler)
+        self.opts         = opts
+        self.fixtures     = load_fixtures()
+        self.host_latency = {h: float(v) for h, v in (x.split("=", 1) for x in opts.host_latency)}
+        self.hits: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def count(self, host: str, hit: bool) -> None:
+        with self._lock:
+            self.hits.setdefault(host, [0, 0])[0 if hit else 1] += 1
+
+    def summary(self) -> str:
+        with self._lock:
+            return ", ".join(f"{h} {ok}" + (f" ({miss} missing)" if miss else "")
+                             for h, (ok, miss) in sorted(self.hits.items())) or "no requests"
+
+
+def make_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8090)
+    ap.add_argument("--latency", type=float, default=0.15, help="seconds added to every response")
+    ap.add_argument("--jitter", type=float, default=0.05, help="stddev of the latency")
+    ap.add_argument("--host-latency", action="append", default=[], metavar="HOST=SEC")
+    ap.add_argument("--record", action="store_true", help="proxy to the real hosts and save fixtures")
+    return ap
+
+
+def start(opts) -> ReplayServer:
+    """Starts a replay server in a background thread (used by tools/bench.py)."""
+    server = ReplayServer((opts.host, opts.port), opts)
+    threading.Thread(target=server.serve_forever, name="replay", daemon=True).start()
+    return server
+
+
+def main():
+    opts = make_parser().parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+    server = ReplayServer((opts.host, opts.port), opts)
+    mode = "recording" if opts.record else f"{len(server.fixtures)} fixtures, latency {opts.latency}s"
+    logger.info(f"Replay server on http://{opts.host}:{opts.port} ({mode})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info(server.summary())
+
+
+if __name__ == "__main__":
+    main()
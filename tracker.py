@@ -0,0 +1,145 @@
+"""baksteenservice - tracker.py — end-to-end timing of each request/reply pair.
+
+Every inbound SMS gets a Trace that collects the moments it was received,
+its reply was queued, the modem confirmed the send (+CMGS <ref>) and the
+network reported delivery (status report for <ref>). Completed traces are
+logged and aggregated per intent; see summary().
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger("baksteenservice.tracker")
+
+STAGES = ("queued", "sent", "delivered")
+
+# Status reports normally arrive within seconds; after this a trace is
+# closed as undelivered so _by_ref does not grow and refs (0-255) can wrap.
+_REPORT_TIMEOUT = 3600
+
+
+class Trace:
+
+    def __init__(self, sender: str, received: float):
+        self.sender   = sender
+        self.intent   = "unknown"
+        self.received = received
+        self.times: Dict[str, float] = {}
+        self.ref: Optional[int] = None
+
+    def steps(self) -> Dict[str, float]:
+        """Seconds spent in each step: receive -> queued -> sent -> delivered, plus total."""
+        out, prev = {}, self.received
+        for stage in STAGES:
+            if stage in self.times:
+                out[stage] = self.times[stage] - prev
+                prev = self.times[stage]
+        out["total"] = prev - self.received
+        return out
+
+
+class _Stat:
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max   = 0.0
+
+    def add(self, v: float) -> None:
+        self.count += 1
+        self.total += v
+        self.max    = max(self.max, v)
+
+
+_lock = threading.Lock()
+_by_ref: Dict[int, Trace] = {}
+_stats:  Dict[str, Dict[str, _Stat]] = {}
+_undelivered: Dict[str, int] = {}
+
+
+def start(msg: Dict) -> Trace:
+    return Trace(msg["sender"], msg.get("timestamp") or time.time())
+
+
+def queued(trace: Optional[Trace]) -> None:
+    if trace:
+        trace.times["queued"] = time.time()
+
+
+def sent(trace: Optional[Trace], ref: int) -> None:
+    if not trace:
+        return
+    trace.times["sent"] = time.time()
+    trace.ref = ref
+    with _lock:
+        _expire()
+        old = _by_ref.get(ref)
+        if old is not None:
+            _close(old, delivered=False)
+        _by_ref[ref] = trace
+
+
+def failed(trace: Optional[Trace]) -> None:
+    """The reply could not be sent at all."""
+    if trace:
+        with _lock:
+            _close(trace, delivered=False)
+
+
+def status_report(ref: int, status: int) -> None:
+    """
+    Handles a status report (+CDS or a stored report in AT+CMGL) for message
+    reference `ref`. TP-Status 0-31 means delivered, 32-63 the SMSC is still
+    trying (ignored), 64+ it gave up.
+    """
+    if 32 <= status < 64:
+        return
+    with _lock:
+        trace = _by_ref.pop(ref, None)
+        if trace is None:
+            logger.debug(f"Status report for unknown ref {ref} (status {status})")
+            return
+        if status < 32:
+            trace.times["delivered"] = time.time()
+        _close(trace, delivered=status < 32)
+    if status >= 64:
+        logger.warning(f"Reply to {trace.sender} (ref {ref}, {trace.intent}) not delivered, status {status}")
+
+
+def _expire() -> None:
+    limit = time.time() - _REPORT_TIMEOUT
+    for ref, trace in list(_by_ref.items()):
+        if trace.times["sent"] < limit:
+            del _by_ref[ref]
+            _close(trace, delivered=False)
+
+
+def _close(trace: Trace, delivered: bool) -> None:
+    """Records a finished trace; the caller holds _lock."""
+    steps = trace.steps()
+    per_intent = _stats.setdefault(trace.intent, {})
+    for step, v in steps.items():
+        per_intent.setdefault(step, _Stat()).add(v)
+        metrics.observe("baksteen_reply_step_seconds", v, intent=trace.intent, step=step)
+    if not delivered:
+        _undelivered[trace.intent] = _undelivered.get(trace.intent, 0) + 1
+        metrics.inc("baksteen_reply_undelivered_total", intent=trace.intent)
+    logger.info(f"Reply to {trace.sender} ({trace.intent}, ref {trace.ref}): "
+                + ", ".join(f"{k} {v:.1f}s" for k, v in steps.items())
+                + ("" if delivered else " [not delivered]"))
+
+
+def summary() -> List[str]:
+    """One line per intent with the mean / max of each step."""
+    with _lock:
+        lines = []
+        for intent, per_step in sorted(_stats.items()):
+            n = per_step["total"].count
+            parts = [f"{step} {s.total / s.count:.1f}/{s.max:.1f}s"
+                     for step in STAGES + ("total",) if (s := per_step.get(step))]
+            lines.append(f"{intent}: n={n} undelivered={_undelivered.get(intent, 0)} "
+                         f"(mean/max) " + ", ".join(parts))
+        return lines
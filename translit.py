@@ -0,0 +1,65 @@
+"""baksteenservice - translit.py — shared accent stripping and GSM-safe ASCII transliteration.
+
+Both functions use a str.translate table: Latin-1 and Latin Extended (U+0000-U+024F)
+and the symbols below are precomputed at import, any other character is computed
+once on first sight and cached. Plain ASCII input is returned as-is.
+"""
+import unicodedata
+
+_SYMBOLS = {
+    "°": "", "€": "EUR", "→": "->", "➡": "->",
+    "–": "-", "—": "-", "…": "...",
+    "’": "'", "‘": "'", "“": '"', "”": '"',
+    "×": "x", "÷": "/",
+    "½": "1/2", "¼": "1/4", "¾": "3/4",
+    "²": "2", "³": "3", "µ": "u",
+    "©": "(c)", "®": "(r)", "™": "(tm)",
+    "•": "-", "·": ".",
+}
+
+_PRECOMPUTED = range(0x0250)
+
+
+def _without_marks(c: str) -> str:
+    return "".join(d for d in unicodedata.normalize("NFD", c) if unicodedata.category(d) != "Mn")
+
+
+class _AccentTable(dict):
+    """ord -> character with combining marks removed (other characters kept)."""
+
+    def __missing__(self, o: int) -> str:
+        v = self[o] = _without_marks(chr(o))
+        return v
+
+
+class _AsciiTable(dict):
+    """ord -> ASCII replacement: symbol table first, then accents removed, rest dropped."""
+
+    def __missing__(self, o: int) -> str:
+        c = chr(o)
+        v = _SYMBOLS.get(c)
+        if v is None:
+            v = _without_marks(c).encode("ascii", errors="ignore").decode("ascii")
+        self[o] = v
+        return v
+
+
+_ACCENTS = _AccentTable()
+_ASCII   = _AsciiTable()
+for _o in list(_PRECOMPUTED) + [ord(c) for c in _SYMBOLS]:
+    _ACCENTS[_o]
+    _ASCII[_o]
+
+
+def strip_accents(text: str) -> str:
+    """Remove combining marks (é -> e); non-Latin characters are kept."""
+    if text.isascii():
+        return text
+    return text.translate(_ACCENTS)
+
+
+def to_ascii(text: str) -> str:
+    """Transliterate to plain ASCII for the modem: symbols spelled out, accents removed, rest dropped."""
+    if text.isascii():
+        return text
+    return text.translate(_ASCII)
@@ -0,0 +1,80 @@
+"""baksteenservice - upstream.py — shared HTTP session for all upstream APIs.
+
+One requests.Session keeps connections to iRail, Google, WeatherAPI, De Lijn,
+apotheek.be and the RSS feeds alive between messages. Every call goes through
+tracked(): it is timed per host into metrics (baksteen_upstream_seconds),
+written to the call ledger and checked against the daily API-key budget.
+For stream=True the time is until the response headers are in.
+
+With config.UPSTREAM_REPLAY set (tools/replay_server.py) every request is
+sent to <replay>/<host><path> instead; host labels stay the real ones.
+"""
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+import ledger
+import metrics
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+
+@contextmanager
+def tracked(url: str):
+    """
+    Wraps one upstream call to url and yields its ledger.Call, on which the
+    caller sets status and bytes. Raises ledger.QuotaExhausted (a
+    requests.RequestException) instead of calling a key that is out of budget.
+    """
+    host = urlsplit(url).hostname or url
+    call = ledger.Call(host, ledger.key_for(host))
+    ledger.check(call.key)
+    t = time.perf_counter()
+    try:
+        with metrics.timer("baksteen_upstream_seconds", host=host):
+            yield call
+    except Exception:
+        call.status = "error"
+        raise
+    finally:
+        call.seconds = time.perf_counter() - t
+        ledger.record(call)
+
+
+def _target(url: str) -> str:
+    if not config.UPSTREAM_REPLAY:
+        return url
+    parts = urlsplit(url)
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{config.UPSTREAM_REPLAY.rstrip('/')}/{parts.hostname}{parts.path}{query}"
+
+
+def preconnect(url: str, timeout: float = 5) -> None:
+    """
+    Opens a pooled connection (DNS, TCP, TLS) to url's host with a HEAD on /,
+    so the first real call skips the handshakes. Not an API call: no ledger.
+    """
+    parts = urlsplit(_target(url))
+    _session.head(f"{parts.scheme}://{parts.netloc}/", timeout=timeout, allow_redirects=False).close()
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """requests.get() on the shared session, timed and counted per host."""
+    with tracked(url) as call:
+        r = _session.get(_target(url), **kwargs)
+        call.status = r.status_code
+        if kwargs.get("stream"):
+            length = r.headers.get("Content-Length")
+            call.bytes = int(length) if length and length.isdigit() else None
+        else:
+            call.bytes = len(r.content)
+    if r.status_code >= 400:
+        metrics.inc("baksteen_upstream_errors_total", host=call.host)
+    return r
@@ -0,0 +1,66 @@
+"""baksteenservice - warmup.py — cold-start warm-up, run while the modem initialises.
+
+SMSListener.start() spends a few seconds in fixed sleeps talking to the
+modem; start() uses that time so the first users after a restart do not
+pay for cold DNS, TLS handshakes and empty caches:
+
+  - a pooled connection to every upstream host (upstream.preconnect)
+  - the De Lijn stop catalogue from disk (bus.start_catalogus)
+  - the weather location map and last run's most asked forecasts (weer.opwarmen)
+  - the openai import and its connection (llm.warm_up, with LLM_OPWARMEN)
+
+News needs nothing here: nieuws.start_poller() fetches the feeds right away.
+iRail answers are not cached, so for trein/route only the connection is warmed.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bus
+import config
+import llm
+import metrics
+import upstream
+import weer
+
+logger = logging.getLogger("baksteenservice.warmup")
+
+UPSTREAM_HOSTS = (
+    "https://api.irail.be",
+    "https://maps.googleapis.com",
+    "http://api.weatherapi.com",
+    "https://api.delijn.be",
+    "https://www.apotheek.be",
+    "https://www.vrt.be",
+    "https://www.demorgen.be",
+)
+
+
+def _task(name: str, fn, *args) -> None:
+    t = time.perf_counter()
+    try:
+        fn(*args)
+    except Exception as e:
+        logger.warning(f"Warm-up {name} failed: {e}")
+    finally:
+        metrics.observe("baksteen_warmup_seconds", time.perf_counter() - t, task=name)
+
+
+def _run() -> None:
+    t = time.perf_counter()
+    tasks = [(f"connect {url.split('//')[1]}", upstream.preconnect, url) for url in UPSTREAM_HOSTS]
+    tasks += [("haltes", bus.start_catalogus), ("weer", weer.opwarmen)]
+    if config.LLM_OPWARMEN:
+        tasks.append(("llm", llm.warm_up))
+    with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="warmup") as pool:
+        for task in tasks:
+            pool.submit(_task, *task)
+    logger.info(f"Warm-up done in {time.perf_counter() - t:.2f}s ({len(tasks)} tasks)")
+
+
+def start() -> threading.Thread:
+    """Starts the warm-up in the background; returns the thread (join() waits for it)."""
+    thread = threading.Thread(target=_run, name="warmup", daemon=True)
+    thread.start()
+    return thread
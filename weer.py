@@ -0,0 +1,341 @@
+"""baksteenservice - weer.py
+WeatherAPI-hulpfuncties voor weer/meteo.
+Exporteert: zoek_locatie(stad)              -> Optional[str]   (q-waarde voor forecast.json)
+            naam(stad)                    -> Optional[str]   (gemeentenaam uit gemeenten.txt)
+            voorspelling(q)               -> dict             (taalneutraal, per uur gecachet)
+            conditie(code, is_day, taal)  -> str
+            start_verversing()
+            opwarmen()
+
+Steden worden via een persistente map naar een locatie vertaald: voorgeladen
+met Belgische gemeenten (gemeenten.txt) en aangevuld met eerdere opzoekingen.
+Enkel onbekende namen kosten nog een search.json call; een tweede met ",belgie"
+volgt alleen als de eerste geen treffer geeft. Voor gemeenten wordt de naam
+uit gemeenten.txt getoond, niet wat WeatherAPI bij de coördinaten vindt.
+
+Voorspellingen worden zonder `lang` opgehaald en als ruwe getallen + conditiecode
+bewaard tot het volgende uur; weer en meteo delen dus één upstream call.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+import config
+import ledger
+import secrets as _secrets
+import upstream
+from cache import TTLCache
+from normalise import normalise
+
+
+log = logging.getLogger("baksteenservice.weer")
+
+
+_SEARCH        = "http://api.weatherapi.com/v1/search.json"
+_FORECAST      = "http://api.weatherapi.com/v1/forecast.json"
+GEMEENTEN_FILE = os.path.join(os.path.dirname(__file__), "gemeenten.txt")
+LOCATIES_FILE  = os.path.join(config.DATA_DIR, "weerlocaties.json")
+POPULAIR_FILE  = os.path.join(config.DATA_DIR, "weerpopulair.json")
+
+
+_lock = threading.Lock()
+_gemeenten: Dict[str, Tuple[str, str]] = {}   # sleutel -> (naam, "lat,lon")
+_locaties: Optional[Dict[str, str]] = None
+
+# (q, "YYYY-mm-dd HH") -> voorspelling; vervalt op het volgende uur
+_voorspellingen = TTLCache(ttl=3600, max_items=500)
+_populair: Counter = Counter()   # q -> (verouderde) aantal vragen; onder _lock
+_POPULAIR_MAX = 200              # locaties die geteld blijven
+_VERVAL       = 0.9              # factor per uur: oude vragen wegen steeds minder
+
+
+# WeatherAPI conditiecode -> (nl, fr); 1000 heeft een dag- en nachtvariant
+_CONDITIES = {
+    1000: ("Zonnig", "Ensoleill\u00e9"),
+    1003: ("Half bewolkt", "Partiellement nuageux"),
+    1006: ("Bewolkt", "Nuageux"),
+    1009: ("Zwaar bewolkt", "Couvert"),
+    1030: ("Nevel", "Brume"),
+    1063: ("Kans op lichte regen", "Pluie \u00e9parse possible"),
+    1066: ("Kans op lichte sneeuw", "Neige \u00e9parse possible"),
+    1069: ("Kans op natte sneeuw", "Neige fondue possible"),
+    1072: ("Kans op ijzel", "Bruine vergla\u00e7ante possible"),
+    1087: ("Kans op onweer", "Risque d'orage"),
+    1114: ("Stuifsneeuw", "Poudrerie"),
+    1117: ("Sneeuwstorm", "Blizzard"),
+    1135: ("Mist", "Brouillard"),
+    1147: ("Aanvriezende mist", "Brouillard givrant"),
+    1150: ("Plaatselijk motregen", "Bruine \u00e9parse"),
+    1153: ("Lichte motregen", "Bruine l\u00e9g\u00e8re"),
+    1168: ("Aanvriezende motregen", "Bruine vergla\u00e7ante"),
+    1171: ("Zware ijzel", "Forte bruine vergla\u00e7ante"),
+    1180: ("Plaatselijk lichte regen", "Pluie l\u00e9g\u00e8re \u00e9parse"),
+    1183: ("Lichte regen", "Pluie l\u00e9g\u00e8re"),
+    1186: ("Af en toe regen", "Pluie mod\u00e9r\u00e9e par moments"),
+    1189: ("Regen", "Pluie mod\u00e9r\u00e9e"),
+    1192: ("Af en toe zware regen", "Forte pluie par moments"),
+    1195: ("Zware regen", "Forte pluie"),
+    1198: ("Lichte ijzelregen", "Pluie vergla\u00e7ante l\u00e9g\u00e8re"),
+    1201: ("IJzelregen", "Pluie vergla\u00e7ante"),
+    1204: ("Lichte natte sneeuw", "Neige fondue l\u00e9g\u00e8re"),
+    1207: ("Natte sneeuw", "Neige fondue"),
+    1210: ("Plaatselijk lichte sneeuw", "Neige l\u00e9g\u00e8re \u00e9parse"),
+    1213: ("Lichte sneeuw", "Neige l\u00e9g\u00e8re"),
+    1216: ("Plaatselijk sneeuw", "Neige mod\u00e9r\u00e9e \u00e9parse"),
+    1219: ("Sneeuw", "Neige mod\u00e9r\u00e9e"),
+    1222: ("Plaatselijk zware sneeuw", "Forte neige \u00e9parse"),
+    1225: ("Zware sneeuw", "Forte neige"),
+    1237: ("IJsregen", "Gr\u00e9sil"),
+    1240: ("Lichte buien", "Averses l\u00e9g\u00e8res"),
+    1243: ("Zware buien", "Fortes averses"),
+    1246: ("Stortregen", "Pluie torrentielle"),
+    1249: ("Lichte natte sneeuwbuien", "Averses de neige fondue l\u00e9g\u00e8res"),
+    1252: ("Natte sneeuwbuien", "Averses de neige fondue"),
+    1255: ("Lichte sneeuwbuien", "Averses de neige l\u00e9g\u00e8res"),
+    1258: ("Sneeuwbuien", "Averses de neige"),
+    1261: ("Lichte hagelbuien", "Averses de gr\u00e9sil l\u00e9g\u00e8res"),
+    1264: ("Hagelbuien", "Averses de gr\u00e9sil"),
+    1273: ("Lichte regen met onweer", "Pluie l\u00e9g\u00e8re et orage"),
+    1276: ("Regen met onweer", "Pluie et orage"),
+    1279: ("Lichte sneeuw met onweer", "Neige l\u00e9g\u00e8re et orage"),
+    1282: ("Sneeuw met onweer", "Neige et orage"),
+}
+_HELDER = ("Helder", "D\u00e9gag\u00e9")
+
+
+
+# ── Locatiemap ─────────────────────────────────────────────────────────────────
+
+
+def _sleutel(stad: str) -> str:
+    return normalise(stad.replace("-", " "))
+
+
+def _laad_gemeenten() -> Dict[str, Tuple[str, str]]:
+    gemeenten: Dict[str, Tuple[str, str]] = {}
+    if not os.path.exists(GEMEENTEN_FILE):
+        return gemeenten
+    with open(GEMEENTEN_FILE, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                naam, lat, lon = line.split(";")
+                gemeenten[_sleutel(naam)] = (naam.strip(), f"{float(lat)},{float(lon)}")
+            except ValueError:
+                log.warning("gemeenten.txt: ongeldige regel '%s'", line)
+    return gemeenten
+
+
+def _map() -> Dict[str, str]:
+    global _locaties, _gemeenten
+    with _lock:
+        if _locaties is None:
+            _gemeenten = _laad_gemeenten()
+            locaties   = {k: q for k, (_, q) in _gemeenten.items()}
+            if os.path.exists(LOCATIES_FILE):
+                try:
+                    with open(LOCATIES_FILE, encoding="utf-8") as f:
+                        locaties.update(json.load(f))
+                except (OSError, ValueError) as e:
+                    log.error("Weerlocaties onleesbaar: %s", e)
+            _locaties = locaties
+            log.info("Weerlocaties geladen: %d", len(locaties))
+        return _locaties
+
+
+def _leer(stad: str, q: str) -> None:
+    """Voegt een opgezochte locatie toe en bewaart alle geleerde locaties."""
+    with _lock:
+        _locaties[_sleutel(stad)] = q
+        geleerd = {k: v for k, v in _locaties.items() if k not in _gemeenten or _gemeenten[k][1] != v}
+        os.makedirs(config.DATA_DIR, exist_ok=True)
+        tmp = LOCATIES_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(geleerd, f, ensure_ascii=False, indent=0)
+        os.replace(tmp, LOCATIES_FILE)
+
+
+
+# ── WeatherAPI search ──────────────────────────────────────────────────────────
+
+
+def _search(query: str) -> List[dict]:
+    try:
+        r = upstream.get(_SEARCH, timeout=10,
+                         params={"key": _secrets.OWM_API_KEY, "q": query})
+        r.raise_for_status()
+        return r.json()
+    except requests.RequestException as e:
+        log.error("WeatherAPI search error: %s", e)
+        return []
+
+
+def _kies(resultaten: List[dict], stad: str) -> Optional[dict]:
+    """Exacte naamtreffer, anders None."""
+    city_lower = stad.strip().lower()
+    for loc in resultaten:
+        if loc["name"].lower() == city_lower:
+            return loc
+    return None
+
+
+def zoek_locatie(stad: str) -> Optional[str]:
+    """q-waarde ('id:123' of 'lat,lon') voor stad, of None als onvindbaar."""
+    sleutel = _sleutel(stad)
+    q = _map().get(sleutel)
+    if q:
+        return q
+
+    results = _search(stad)
+    loc = _kies(results, stad)
+    if loc is None:
+        # enkel bij een misser: nog eens, beperkt tot België
+        loc = _kies(_search(f"{stad},belgie"), stad) or (results[0] if results else None)
+    if loc is None:
+        return None
+    q = f"id:{loc['id']}"
+    _leer(stad, q)
+    log.info("Weerlocatie geleerd: '%s' -> %s", stad, q)
+    return q
+
+
+def naam(stad: str) -> Optional[str]:
+    """Naam zoals in gemeenten.txt als stad een gemeente is; anders None (dan geldt WeatherAPI's naam)."""
+    _map()
+    gemeente = _gemeenten.get(_sleutel(stad))
+    return gemeente[0] if gemeente else None
+
+
+
+# ── Voorspellingen ─────────────────────────────────────────────────────────────
+
+
+def conditie(code: int, is_day: int, taal: str) -> str:
+    """Lokale NL/FR omschrijving van een WeatherAPI conditiecode."""
+    i = 1 if taal == "fr" else 0
+    if code == 1000 and not is_day:
+        return _HELDER[i]
+    paar = _CONDITIES.get(code)
+    return paar[i] if paar else "?"
+
+
+def _uur_sleutel(nu: datetime) -> str:
+    return nu.strftime("%Y-%m-%d %H")
+
+
+def _tot_volgend_uur(nu: datetime) -> float:
+    volgend = nu.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    return max((volgend - nu).total_seconds(), 1.0)
+
+
+def _haal_voorspelling(q: str) -> dict:
+    """Eén forecast.json call, herleid tot taalneutrale getallen. Gooit RequestException."""
+    r = upstream.get(_FORECAST, timeout=10,
+                     params={"key": _secrets.OWM_API_KEY, "q": q, "days": 1,
+                             "aqi": "no", "alerts": "no"})
+    r.raise_for_status()
+    d   = r.json()
+    fd  = d["forecast"]["forecastday"][0]
+    return {
+        "name":  d["location"]["name"],
+        "min_c": fd["day"]["mintemp_c"],
+        "max_c": fd["day"]["maxtemp_c"],
+        "hours": [{
+            "time":           h["time"].split(" ")[1][:5],
+            "hour":           int(h["time"].split(" ")[1].split(":")[0]),
+            "temp_c":         h["temp_c"],
+            "code":           h["condition"]["code"],
+            "is_day":         h.get("is_day", 1),
+            "wind_kph":       h["wind_kph"],
+            "chance_of_rain": h.get("chance_of_rain", 0),
+        } for h in fd["hour"]],
+    }
+
+
+def voorspelling(q: str) -> dict:
+    """Voorspelling voor q, tot het volgende uur gedeeld door alle requests en talen."""
+    with _lock:
+        _populair[q] += 1
+    nu = datetime.now()
+    return _voorspellingen.get_or_fetch((q, _uur_sleutel(nu)), lambda: _haal_voorspelling(q),
+                                        ttl=_tot_volgend_uur(nu))
+
+
+def _verouder_populair() -> Dict[str, float]:
+    """
+    Geeft een kopie van de tellingen (meest gevraagd eerst) en laat ze
+    verouderen: alles x _VERVAL, enkel de top _POPULAIR_MAX blijft over.
+    """
+    with _lock:
+        top = _populair.most_common(_POPULAIR_MAX)
+        _populair.clear()
+        _populair.update({q: n * _VERVAL for q, n in top if n * _VERVAL >= 0.5})
+    return dict(top)
+
+
+def _ververs_populair() -> None:
+    if ledger.degraded("OWM_API_KEY"):
+        log.warning("WeatherAPI dagquota bijna op, vooraf ophalen overgeslagen")
+        return
+    tellingen = _verouder_populair()
+    nu = datetime.now()
+    top = list(tellingen)[:config.WEER_VOORAF_TOP]
+    for q in top:
+        try:
+            _voorspellingen.get_or_fetch((q, _uur_sleutel(nu)), lambda: _haal_voorspelling(q),
+                                         ttl=_tot_volgend_uur(nu))
+        except Exception as e:
+            log.warning("Vooraf ophalen %s mislukt: %s", q, e)
+    log.info("Populaire voorspellingen ververst (%d)", len(top))
+    _bewaar_populair(tellingen)
+
+
+def _bewaar_populair(tellingen: Dict[str, float]) -> None:
+    """Bewaart de tellingen, zodat opwarmen() na een herstart weet wat populair is."""
+    try:
+        os.makedirs(config.DATA_DIR, exist_ok=True)
+        tmp = POPULAIR_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(tellingen, f, ensure_ascii=False, indent=0)
+        os.replace(tmp, POPULAIR_FILE)
+    except OSError as e:
+        log.error("Populaire locaties niet bewaard: %s", e)
+
+
+def _verversing_loop() -> None:
+    while True:
+        time.sleep(_tot_volgend_uur(datetime.now()) + 5)
+        try:
+            _ververs_populair()
+        except Exception:
+            log.exception("Verversen populaire voorspellingen mislukt")
+
+
+def opwarmen() -> None:
+    """Bij opstart: laadt de locatiemap en haalt de populairste locaties van vorige keer al op."""
+    _map()
+    if os.path.exists(POPULAIR_FILE):
+        try:
+            with open(POPULAIR_FILE, encoding="utf-8") as f:
+                bewaard = json.load(f)
+            with _lock:
+                if not _populair:
+                    _populair.update(bewaard)
+        except (OSError, ValueError) as e:
+            log.error("Populaire locaties onleesbaar: %s", e)
+    _ververs_populair()
+
+
+def start_verversing() -> None:
+    """Haalt elk uur, net na de uurwissel, de meest gevraagde locaties al op."""
+    threading.Thread(target=_verversing_loop, daemon=True, name="weer").start()